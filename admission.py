@@ -0,0 +1,144 @@
+"""
+Admission control for inference requests.
+
+At most `max_depth` requests are admitted at a time (queued in the batch
+scheduler or decoding). Every admitted request carries a deadline: the
+client's timeout capped by the server's maximum. A request is refused up
+front - instead of waiting in a queue it cannot leave in time - when the
+queue is full (429) or when its expected latency - the recent service time
+per decoding step, times its steps, times the scheduler rounds ahead of it
+at the current depth - already exceeds its budget (503). Both carry a Retry-After hint. Decoders check the deadline
+between steps and stop with `DeadlineExceeded` once it has passed.
+"""
+
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before decoding finished."""
+
+
+class Rejected(Exception):
+    """The request was not admitted; `status` is the HTTP code to return."""
+
+    def __init__(self, message: str, status: int, retry_after_s: int):
+        super().__init__(message)
+        self.status = status
+        self.retry_after_s = retry_after_s
+
+
+def expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+
+class Ticket:
+    """One admitted request; release exactly once when it is done."""
+
+    def __init__(self, control: "AdmissionControl", deadline: float, steps: int, rounds: int):
+        self._control = control
+        self.deadline = deadline
+        self.steps = steps
+        # Scheduler rounds until this request is done, as seen at admission
+        self.rounds = rounds
+        self.started = time.monotonic()
+        self._released = False
+
+    def release(self, record: bool = True):
+        """Free the slot; `record` feeds its service time into the estimate.
+
+        Pass record=False when the time says little about the work, e.g. the
+        request stopped early or waited on a slow client.
+        """
+        if not self._released:
+            self._released = True
+            self._control._release(self, record)
+
+
+class AdmissionControl:
+    def __init__(self, max_depth: int, max_timeout_ms: float, concurrency: int = 1, smoothing: float = 0.2):
+        self.max_depth = max(1, max_depth)
+        self.max_timeout_ms = max_timeout_ms
+        # Requests served side by side (the scheduler's batch size), which
+        # divides the wait caused by the ones ahead.
+        self.concurrency = max(1, concurrency)
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self.depth = 0
+        self.max_seen_depth = 0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_deadline = 0
+        self.deadline_exceeded = 0
+        # Smoothed time per decoding step of one request
+        self.step_ms: Optional[float] = None
+
+    def _rounds(self, depth: int) -> int:
+        return 1 + depth // self.concurrency
+
+    def _expected_ms(self, depth: int, steps: int) -> float:
+        if self.step_ms is None:
+            return 0.0
+        return self.step_ms * max(1, steps) * self._rounds(depth)
+
+    def admit(self, timeout_ms: Optional[float] = None, steps: int = 1) -> Ticket:
+        """A ticket for a request of `steps` decoding steps, or `Rejected`
+        when it cannot be served in time."""
+        budget_ms = self.max_timeout_ms if not timeout_ms or timeout_ms <= 0 else min(timeout_ms, self.max_timeout_ms)
+        with self._lock:
+            expected_ms = self._expected_ms(self.depth, steps)
+            retry_after_s = max(1, math.ceil(expected_ms / 1000))
+            if self.depth >= self.max_depth:
+                self.rejected_full += 1
+                raise Rejected(f"server is saturated ({self.depth} requests in flight)", 429, retry_after_s)
+            if expected_ms > budget_ms:
+                self.rejected_deadline += 1
+                raise Rejected(
+                    f"request would miss its deadline (expected {expected_ms:.0f} ms, budget {budget_ms:.0f} ms)",
+                    503,
+                    retry_after_s,
+                )
+            rounds = self._rounds(self.depth)
+            self.depth += 1
+            self.admitted += 1
+            self.max_seen_depth = max(self.max_seen_depth, self.depth)
+        return Ticket(self, time.monotonic() + budget_ms / 1000, max(1, steps), rounds)
+
+    def _release(self, ticket: Ticket, record: bool):
+        # Per step and round, so that queueing behind others is not counted twice
+        step_ms = (time.monotonic() - ticket.started) * 1000 / (ticket.steps * ticket.rounds)
+        with self._lock:
+            self.depth -= 1
+            if record:
+                if self.step_ms is None:
+                    self.step_ms = step_ms
+                else:
+                    self.step_ms += self.smoothing * (step_ms - self.step_ms)
+
+    def record_deadline_exceeded(self):
+        with self._lock:
+            self.deadline_exceeded += 1
+
+    def retry_after_s(self) -> int:
+        with self._lock:
+            return max(1, math.ceil(self._expected_ms(self.depth, 1) / 1000))
+
+    @property
+    def saturated(self) -> bool:
+        return self.depth >= self.max_depth
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "queue_depth": self.depth,
+                "max_queue_depth": self.max_depth,
+                "max_seen_depth": self.max_seen_depth,
+                "admitted": self.admitted,
+                "rejected_full": self.rejected_full,
+                "rejected_deadline": self.rejected_deadline,
+                "deadline_exceeded": self.deadline_exceeded,
+                "step_ms": round(self.step_ms, 3) if self.step_ms is not None else None,
+                "max_timeout_ms": self.max_timeout_ms,
+            }
@@ -0,0 +1,154 @@
+"""
+Precomputed next-token candidates for the most frequent contexts.
+
+Production prompts mostly land on a small set of common contexts, so their
+top-k continuations can be computed offline in large batches
+(scripts/build_continuation_index.py) and served without running the model.
+
+The file is a sectioned file (sectioned_file.py), like vocab.bin: a JSON
+header (model source, SEQ_LEN, k, coverage) and sections - the padded context keys as an
+(n, SEQ_LEN) int32 array, their top-k ids (int32) and probabilities
+(float32), and an open-addressing hash table (crc32 of the key bytes, linear
+probing) holding row + 1. `ContinuationIndex.load` maps the file read-only,
+so it costs a header parse and a lookup is one hash plus a key comparison.
+"""
+
+import threading
+import zlib
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from sectioned_file import map_sections, read_header, write_sections
+
+
+INDEX_MAGIC = b"NWPCIDX1"
+
+
+def frequent_contexts(ids: np.ndarray, seq_len: int, max_contexts: int, min_count: int = 2):
+    """The most frequent padded contexts of a token stream, most frequent first.
+
+    Counts every full `seq_len` window that is followed by a token, plus the
+    1 .. seq_len-1 token n-grams left-padded with 0 - what a prompt shorter
+    than `seq_len` looks like to the model. Returns ``(contexts, counts,
+    windows)``: an (n, seq_len) int32 array, the count of each row, and the
+    number of full windows counted.
+    """
+    ids = np.ascontiguousarray(ids, dtype=np.int32)
+    row = np.dtype((np.void, 4 * seq_len))
+    keys, counts = [], []
+    windows = max(0, len(ids) - seq_len)
+    for n in range(1, seq_len + 1):
+        grams = np.lib.stride_tricks.sliding_window_view(ids, n)[: len(ids) - n]
+        if not len(grams):
+            continue
+        padded = np.zeros((len(grams), seq_len), dtype=np.int32)
+        padded[:, seq_len - n :] = grams
+        unique, count = np.unique(padded.view(row).ravel(), return_counts=True)
+        keep = count >= min_count
+        keys.append(unique[keep])
+        counts.append(count[keep])
+    if not keys:
+        return np.zeros((0, seq_len), dtype=np.int32), np.zeros(0, dtype=np.int64), windows
+    keys = np.concatenate(keys)
+    counts = np.concatenate(counts)
+    order = np.argsort(-counts, kind="stable")[:max_contexts]
+    contexts = keys[order].view(np.int32).reshape(-1, seq_len)
+    return contexts, counts[order], windows
+
+
+def write_index(path: str, contexts: np.ndarray, ids: np.ndarray, probs: np.ndarray, meta: Dict):
+    """Write `contexts` (n, SEQ_LEN) with their top-k `ids`/`probs` (n, k).
+
+    `meta` must name the model the candidates came from under ``source``;
+    anything else in it (coverage, dataset) is kept in the header as is.
+    """
+    contexts = np.ascontiguousarray(contexts, dtype=np.int32)
+    n, seq_len = contexts.shape
+    table_size = 1
+    while table_size < 2 * n + 1:
+        table_size *= 2
+    hash_table = np.zeros(table_size, dtype=np.uint32)
+    mask = table_size - 1
+    for i in range(n):
+        slot = zlib.crc32(contexts[i].tobytes()) & mask
+        while hash_table[slot]:
+            slot = (slot + 1) & mask
+        hash_table[slot] = i + 1
+
+    sections = {
+        "contexts": contexts,
+        "ids": np.asarray(ids, dtype=np.int32),
+        "probs": np.asarray(probs, dtype=np.float32),
+        "hash_table": hash_table,
+    }
+    header = {**meta, "seq_len": seq_len, "k": int(ids.shape[1]) if n else 0, "count": n}
+    write_sections(path, INDEX_MAGIC, header, sections)
+
+
+def read_index_header(path: str) -> Optional[Dict]:
+    return read_header(path, INDEX_MAGIC)
+
+
+class ContinuationIndex:
+    """Read-only context -> top-k candidates map backed by a memory-mapped file."""
+
+    def __init__(self, path: str):
+        self.header, sections = map_sections(path, INDEX_MAGIC)
+        for name, view in sections.items():
+            setattr(self, "_" + name, view)
+        self.source = self.header.get("source")
+        self.seq_len = self.header["seq_len"]
+        self.k = self.header["k"]
+        self.count = self.header["count"]
+        self._key_bytes = 4 * self.seq_len
+        self._contexts_bytes = memoryview(self._contexts.reshape(-1).view(np.uint8))
+        self._hash_mv = memoryview(self._hash_table).cast("B").cast("I") if self.count else None
+        self._mask = len(self._hash_table) - 1
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: str) -> "ContinuationIndex":
+        return cls(path)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _row(self, key: bytes) -> int:
+        if not self.count:
+            return -1
+        slot = zlib.crc32(key) & self._mask
+        size = self._key_bytes
+        while True:
+            entry = self._hash_mv[slot]
+            if not entry:
+                return -1
+            start = (entry - 1) * size
+            if self._contexts_bytes[start : start + size] == key:
+                return entry - 1
+            slot = (slot + 1) & self._mask
+
+    def get(self, context) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(ids, probs) for a padded context (sequence of SEQ_LEN ids), or None."""
+        row = self._row(np.asarray(context, dtype=np.int32).tobytes())
+        with self._lock:
+            if row < 0:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self._ids[row], self._probs[row]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "entries": self.count,
+            "top_k": self.k,
+            "corpus_coverage": self.header.get("coverage"),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
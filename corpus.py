@@ -0,0 +1,255 @@
+"""
+Streaming corpus ingestion.
+
+Reads the dataset in bounded blocks cut at word boundaries, fits word counts
+incrementally with the same rules as Keras `Tokenizer.fit_on_texts([text])`,
+and writes the token ids to an on-disk `.npy` array, so memory use stays
+roughly constant however large the corpus is.
+
+`cached_token_ids` keeps those arrays in a content-addressed cache directory,
+keyed by a hash of the dataset bytes and of the tokenizer (config and the
+vocabulary ids it can emit), so training, evaluation and benchmarks reuse one
+memory-mapped copy until either changes.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from collections import Counter, defaultdict
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from fast_tokenizer import FastTokenizer, compile_splitter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Keras Tokenizer defaults
+DEFAULT_FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+DEFAULT_SPLIT = " "
+
+BLOCK_CHARS = int(os.environ.get("CORPUS_BLOCK_CHARS", str(1 << 20)))
+
+# Used when the dataset file is missing, so the app can still start
+FALLBACK_TEXT = (
+    "the quick brown fox jumps over the lazy dog. "
+    "the quick brown cat sleeps on the warm mat. "
+    "the smart student studies hard and learns quickly. "
+)
+
+
+def iter_blocks(path: str, block_chars: int = BLOCK_CHARS, boundary: str = DEFAULT_FILTERS + DEFAULT_SPLIT) -> Iterator[str]:
+    """Yield the corpus in blocks of about `block_chars`, never splitting a word.
+
+    Each block ends on a filter or split character, so tokenizing the blocks
+    one by one gives exactly the tokens of the whole text.
+    """
+    if not os.path.exists(path):
+        yield FALLBACK_TEXT
+        return
+    carry = ""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        while True:
+            block = f.read(block_chars)
+            if not block:
+                break
+            block = carry + block
+            cut = len(block)
+            while cut > 0 and block[cut - 1] not in boundary:
+                cut -= 1
+            if cut == 0:
+                # No boundary in the whole block: one very long word.
+                carry = block
+                continue
+            carry = block[cut:]
+            yield block[:cut]
+    if carry:
+        yield carry
+
+
+def text_to_words(text: str, filters: str = DEFAULT_FILTERS, lower: bool = True, split: str = DEFAULT_SPLIT) -> List[str]:
+    """Same result as keras.preprocessing.text.text_to_word_sequence."""
+    return compile_splitter(filters, lower, split)(text)
+
+
+def sample_prompts(text: str, n: int, rng: np.random.Generator) -> List[str]:
+    """Prompts like a user would type: the first 1-8 words of random lines."""
+    lines = [line.split() for line in text.splitlines() if line.strip()]
+    if not lines:
+        return []
+    prompts = []
+    for i in rng.integers(0, len(lines), size=n):
+        words = lines[i]
+        prompts.append(" ".join(words[: rng.integers(1, min(len(words), 8) + 1)]))
+    return prompts
+
+
+def fit_word_counts(blocks, filters: str = DEFAULT_FILTERS, lower: bool = True, split: str = DEFAULT_SPLIT) -> Counter:
+    """Word counts in first-seen order, as Tokenizer.word_counts would hold them."""
+    counts = Counter()
+    words = compile_splitter(filters, lower, split)
+    for block in blocks:
+        counts.update(words(block))
+    return counts
+
+
+def tokenizer_from_counts(counts: Counter, num_words: Optional[int], oov_token: Optional[str]):
+    """A Keras Tokenizer in the state fit_on_texts([corpus]) would leave it in."""
+    from tensorflow.keras.preprocessing.text import Tokenizer
+
+    tokenizer = Tokenizer(num_words=num_words, oov_token=oov_token)
+    tokenizer.word_counts.update(counts)
+    tokenizer.document_count = 1
+    tokenizer.word_docs = defaultdict(int, {w: 1 for w in counts})
+
+    # Same ordering rule as fit_on_texts: stable sort by count, descending.
+    wcounts = sorted(counts.items(), key=lambda x: x[1], reverse=True)
+    sorted_voc = [] if oov_token is None else [oov_token]
+    sorted_voc.extend(w for w, _ in wcounts)
+    tokenizer.word_index = dict(zip(sorted_voc, range(1, len(sorted_voc) + 1)))
+    tokenizer.index_word = {i: w for w, i in tokenizer.word_index.items()}
+    tokenizer.index_docs = defaultdict(int, {tokenizer.word_index[w]: 1 for w in counts})
+    return tokenizer
+
+
+def fit_tokenizer(path: str, num_words: Optional[int], oov_token: Optional[str] = "<OOV>"):
+    return tokenizer_from_counts(fit_word_counts(iter_blocks(path)), num_words, oov_token)
+
+
+def write_token_ids(tokenizer, path: str, out_path: str) -> np.ndarray:
+    """Tokenize the corpus block by block into `out_path` (.npy, int32).
+
+    Returns the result memory-mapped read-only.
+    """
+    raw_path = out_path + ".raw"
+    count = 0
+    fast = FastTokenizer.from_tokenizer(tokenizer)
+    with open(raw_path, "wb") as raw:
+        for block in iter_blocks(path):
+            ids = fast.text_to_ids(block)
+            raw.write(ids.tobytes())
+            count += len(ids)
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        np.lib.format.write_array_header_1_0(out, {"descr": "<i4", "fortran_order": False, "shape": (count,)})
+        with open(raw_path, "rb") as raw:
+            shutil.copyfileobj(raw, out, 1 << 20)
+    os.remove(raw_path)
+    os.replace(tmp_path, out_path)
+    return np.load(out_path, mmap_mode="r")
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process in KB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak // 1024 if os.uname().sysname == "Darwin" else peak
+
+
+def file_digest(path: str, memo_path: Optional[str] = None) -> str:
+    """sha256 of a file's bytes, memoized by (size, mtime) in `memo_path`."""
+    st = os.stat(path)
+    stamp = [st.st_size, st.st_mtime_ns]
+    memo = {}
+    if memo_path and os.path.exists(memo_path):
+        try:
+            with open(memo_path, "r", encoding="utf-8") as f:
+                memo = json.load(f)
+        except (OSError, ValueError):
+            memo = {}
+    key = os.path.abspath(path)
+    entry = memo.get(key)
+    if entry and entry["stamp"] == stamp:
+        return entry["sha256"]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    if memo_path:
+        memo[key] = {"stamp": stamp, "sha256": digest.hexdigest()}
+        tmp_path = memo_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(memo, f)
+        os.replace(tmp_path, memo_path)
+    return digest.hexdigest()
+
+
+def tokenizer_digest(tokenizer) -> str:
+    """Hash of everything that decides which ids texts_to_sequences emits."""
+    num_words = tokenizer.num_words
+    config = {
+        "num_words": num_words,
+        "filters": tokenizer.filters,
+        "lower": tokenizer.lower,
+        "split": tokenizer.split,
+        "char_level": tokenizer.char_level,
+        "oov_token": tokenizer.oov_token,
+    }
+    # Words at or above num_words all become the OOV id, so only the
+    # reachable part of the vocabulary matters.
+    vocab = sorted((i, w) for w, i in tokenizer.word_index.items() if not num_words or i < num_words)
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8"))
+    digest.update(json.dumps(vocab).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _prune_cache(cache_dir: str, max_bytes: int, keep: str):
+    """Delete least recently used entries until the directory fits `max_bytes`."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".npy"):
+            path = os.path.join(cache_dir, name)
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        os.remove(path)
+        meta_path = path[: -len(".npy")] + ".json"
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        total -= size
+
+
+def cached_token_ids(tokenizer, path: str, cache_dir: str, max_bytes: int) -> np.ndarray:
+    """Token ids of `path`, memory-mapped from the cache or built and stored there.
+
+    An entry is rebuilt when its file is missing, unreadable or does not match
+    the token count recorded next to it. Entries are touched on every use and
+    the least recently used ones are removed once the directory exceeds
+    `max_bytes`.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    dataset_key = file_digest(path, os.path.join(cache_dir, "digests.json")) if os.path.exists(path) else "fallback"
+    key = hashlib.sha256(f"{dataset_key}:{tokenizer_digest(tokenizer)}".encode("utf-8")).hexdigest()[:32]
+    ids_path = os.path.join(cache_dir, key + ".npy")
+    meta_path = os.path.join(cache_dir, key + ".json")
+
+    if os.path.exists(ids_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            ids = np.load(ids_path, mmap_mode="r")
+            if ids.dtype == np.int32 and ids.shape == (meta["tokens"],):
+                os.utime(ids_path)
+                return ids
+        except (OSError, ValueError, KeyError):
+            pass
+
+    ids = write_token_ids(tokenizer, path, ids_path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"dataset": os.path.abspath(path), "dataset_sha256": dataset_key, "tokens": len(ids)}, f)
+    _prune_cache(cache_dir, max_bytes, keep=ids_path)
+    return ids
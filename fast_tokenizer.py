@@ -0,0 +1,127 @@
+"""
+Vectorized tokenization with the same ids as Keras `Tokenizer.texts_to_sequences`.
+
+Keras lowercases, translates every filter character to `split`, splits, drops
+empty strings and then looks words up one by one in Python. Here, with ASCII
+filters and a one-character ASCII `split` (the Keras defaults), the lowercased
+text is encoded once and the filter/split passes run on bytes
+(`bytes.translate` + `bytes.split`, both single C loops; UTF-8 continuation
+bytes are never ASCII, so multi-byte characters are untouched). Other
+settings fall back to one precompiled regex `findall`. Ids are looked up for a
+whole batch of texts at once with `map` over a dict that only holds the ids
+`texts_to_sequences` can emit (`id < num_words`), straight into an int32
+array.
+"""
+
+import re
+from itertools import repeat
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+
+def compile_splitter(filters: str, lower: bool, split: str, char_level: bool = False) -> Callable[[str], List[str]]:
+    """text -> words, identical to keras.preprocessing.text.text_to_word_sequence."""
+    if char_level:
+        return (lambda text: list(text.lower())) if lower else list
+    if len(split) == 1:
+        pattern = re.compile("[^" + "".join(re.escape(c) for c in set(filters + split)) + "]+")
+        findall = pattern.findall
+        return (lambda text: findall(text.lower())) if lower else findall
+
+    # Multi-character split strings: follow Keras literally.
+    table = str.maketrans({c: split for c in filters})
+
+    def words(text: str) -> List[str]:
+        if lower:
+            text = text.lower()
+        return [w for w in text.translate(table).split(split) if w]
+
+    return words
+
+
+# What bytes.split() with no argument splits on.
+_ASCII_WHITESPACE = b" \t\n\r\x0b\x0c"
+
+
+class FastTokenizer:
+    """Drop-in `texts_to_sequences` for a fitted Keras (or engine) tokenizer."""
+
+    def __init__(
+        self,
+        word_index: Dict[str, int],
+        num_words: Optional[int],
+        oov_token: Optional[str],
+        filters: str,
+        lower: bool = True,
+        split: str = " ",
+        char_level: bool = False,
+    ):
+        self.num_words = num_words
+        self.oov_token = oov_token
+        self.filters = filters
+        self.lower = lower
+        self.split = split
+        self.char_level = char_level
+        self.oov_index = word_index.get(oov_token) if oov_token is not None else None
+        # Words at or above num_words become the OOV id (or are dropped), the
+        # same as an unknown word, so they are simply left out.
+        reachable = {w: i for w, i in word_index.items() if not num_words or i < num_words}
+        # -1 marks words to drop when there is no OOV token.
+        self._missing = self.oov_index if self.oov_index is not None else -1
+
+        self._bytes = not char_level and len(split) == 1 and (filters + split).isascii()
+        if self._bytes:
+            sep = split.encode("ascii")
+            self._table = bytes.maketrans(filters.encode("ascii"), sep * len(filters))
+            self._sep = sep
+            # Whitespace that is not turned into `split` must stay inside words,
+            # which rules out the faster no-argument split() when present.
+            self._kept_ws = [bytes([b]) for b in _ASCII_WHITESPACE if chr(b) not in filters + split]
+            self._index = {w.encode("utf-8", "surrogatepass"): i for w, i in reachable.items()}
+        else:
+            self._words = compile_splitter(filters, lower, split, char_level)
+            self._index = reachable
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer) -> "FastTokenizer":
+        return cls(
+            tokenizer.word_index,
+            tokenizer.num_words,
+            tokenizer.oov_token,
+            tokenizer.filters,
+            tokenizer.lower,
+            tokenizer.split,
+            tokenizer.char_level,
+        )
+
+    def _keys(self, text: str) -> list:
+        """Words of `text` in the form `_index` is keyed by."""
+        if not self._bytes:
+            return self._words(text)
+        if self.lower:
+            text = text.lower()
+        data = text.encode("utf-8", "surrogatepass").translate(self._table)
+        if self._sep == b" " and not any(ws in data for ws in self._kept_ws):
+            return data.split()
+        return [w for w in data.split(self._sep) if w]
+
+    def _lookup(self, keys: list) -> np.ndarray:
+        ids = np.fromiter(map(self._index.get, keys, repeat(self._missing)), dtype=np.int32, count=len(keys))
+        return ids if self._missing >= 0 else ids[ids >= 0]
+
+    def text_to_ids(self, text: str) -> np.ndarray:
+        """Token ids of one text as an int32 array."""
+        return self._lookup(self._keys(text))
+
+    def texts_to_ids(self, texts: List[str]) -> List[np.ndarray]:
+        """Token ids of each text, looked up in one pass over all their words."""
+        per_text = [self._keys(text) for text in texts]
+        if self._missing < 0 or len(per_text) < 2:
+            # Nothing to batch, or dropped words would shift the boundaries.
+            return [self._lookup(keys) for keys in per_text]
+        ids = self._lookup([k for keys in per_text for k in keys])
+        return np.split(ids, np.cumsum([len(keys) for keys in per_text[:-1]]))
+
+    def texts_to_sequences(self, texts: List[str]) -> List[List[int]]:
+        return [ids.tolist() for ids in self.texts_to_ids(texts)]
@@ -15,6 +15,7 @@ const statusTextEl = document.getElementById('status-text');
 const charCounterEl = document.getElementById('char-counter');
 const btnTextEl = document.getElementById('btn-text');
 const btnLoadingEl = document.getElementById('btn-loading');
+const suggestionsEl = document.getElementById('suggestions');
 
 // State management
 let isBackendConnected = false;
@@ -29,6 +30,22 @@ async function checkBackendStatus() {
     });
     
     if (response.ok) {
+      // The server answers /health while the model is still loading
+      const ready = await fetch(`${API_BASE}/ready`, { method: 'GET' });
+      if (!ready.ok) {
+        const body = await ready.json().catch(() => ({}));
+        isBackendConnected = false;
+        let message = '⏳ Backend is loading the model...';
+        if (body.status === 'saturated') {
+          message = '⏳ Backend is busy, retrying shortly...';
+        } else if (body.status === 'training' && body.training) {
+          const { epochs_done, epochs, progress } = body.training;
+          message = `⏳ Backend is training the model (epoch ${Math.min(epochs_done + 1, epochs)}/${epochs}, ${Math.round(progress * 100)}%)...`;
+        }
+        updateStatus(message, 'disconnected');
+        btnEl.disabled = true;
+        return;
+      }
       isBackendConnected = true;
       updateStatus('✅ Backend connected', 'connected');
       btnEl.disabled = false;
@@ -134,6 +151,73 @@ function displayError(error) {
   `;
 }
 
+// Parse one Server-Sent Event block ("event: ...\ndata: ...")
+function parseSseEvent(raw) {
+  let type = 'message';
+  let data = '';
+  raw.split('\n').forEach(line => {
+    if (line.startsWith('event:')) {
+      type = line.slice(6).trim();
+    } else if (line.startsWith('data:')) {
+      data += line.slice(5).trim();
+    }
+  });
+  return { type, data: data ? JSON.parse(data) : {} };
+}
+
+// Stream words from /predict/stream, rendering each one as it arrives.
+// Starting a new prediction aborts the previous stream, which also stops
+// the decoding on the server.
+let activeStream = null;
+
+async function predictStream(text, num) {
+  if (activeStream) {
+    activeStream.abort();
+  }
+  activeStream = new AbortController();
+
+  const response = await fetch(`${API_BASE}/predict/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ text, num_words: num }),
+    signal: activeStream.signal
+  });
+
+  if (!response.ok || !response.body) {
+    const data = await response.json().catch(() => ({}));
+    throw new Error(data.error || `Server error: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  const words = [];
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) {
+      break;
+    }
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const event = parseSseEvent(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+
+      if (event.type === 'word') {
+        words.push(event.data.word);
+        displayResult({ completion: words.join(' '), words }, text);
+      } else if (event.type === 'error') {
+        throw new Error(event.data.error);
+      } else if (event.type === 'done') {
+        return event.data;
+      }
+    }
+  }
+  return { completion: words.join(' '), words };
+}
+
 // Main prediction function
 async function predict() {
   const text = (textEl.value || '').trim();
@@ -153,21 +237,13 @@ async function predict() {
   try {
     setLoadingState(true);
     
-    const response = await fetch(`${API_BASE}/predict`, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ text, num_words: num })
-    });
-    
-    const data = await response.json();
-    
-    if (!response.ok) {
-      throw new Error(data.error || `Server error: ${response.status}`);
-    }
-    
+    const data = await predictStream(text, num);
     displayResult(data, text);
     
   } catch (error) {
+    if (error.name === 'AbortError') {
+      return;
+    }
     console.error('Prediction error:', error);
     displayError(error.message);
   } finally {
@@ -175,18 +251,81 @@ async function predict() {
   }
 }
 
+// Autocomplete the word being typed. Requests are debounced, and a newer
+// keystroke aborts the one in flight so stale completions never render.
+const COMPLETE_DEBOUNCE_MS = 150;
+let completeTimer = null;
+let activeComplete = null;
+
+function clearSuggestions() {
+  suggestionsEl.innerHTML = '';
+}
+
+function displaySuggestions(data) {
+  clearSuggestions();
+  data.completions.forEach(({ word }) => {
+    const chip = document.createElement('button');
+    chip.type = 'button';
+    chip.className = 'suggestion-chip';
+    chip.textContent = word;
+    // Replace the partial word (everything after the context) with the choice
+    chip.addEventListener('click', () => {
+      textEl.value = `${data.context}${word} `;
+      updateCharCounter();
+      clearSuggestions();
+      textEl.focus();
+      scheduleComplete();
+    });
+    suggestionsEl.appendChild(chip);
+  });
+}
+
+async function fetchCompletions() {
+  const text = textEl.value || '';
+  if (activeComplete) {
+    activeComplete.abort();
+  }
+  if (!text.trim() || !isBackendConnected) {
+    clearSuggestions();
+    return;
+  }
+  activeComplete = new AbortController();
+  try {
+    const params = new URLSearchParams({ text, limit: '5' });
+    const response = await fetch(`${API_BASE}/complete?${params}`, { signal: activeComplete.signal });
+    if (!response.ok) {
+      clearSuggestions();
+      return;
+    }
+    displaySuggestions(await response.json());
+  } catch (error) {
+    if (error.name !== 'AbortError') {
+      clearSuggestions();
+    }
+  }
+}
+
+function scheduleComplete() {
+  clearTimeout(completeTimer);
+  completeTimer = setTimeout(fetchCompletions, COMPLETE_DEBOUNCE_MS);
+}
+
 // Set example text
 function setExampleText(text) {
   textEl.value = text;
   updateCharCounter();
+  clearSuggestions();
   textEl.focus();
 }
 
 // Event Listeners
 btnEl.addEventListener('click', predict);
 
-// Character counter
-textEl.addEventListener('input', updateCharCounter);
+// Character counter and completions
+textEl.addEventListener('input', () => {
+  updateCharCounter();
+  scheduleComplete();
+});
 
 // Enter key to predict
 textEl.addEventListener('keydown', (e) => {
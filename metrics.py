@@ -0,0 +1,188 @@
+"""
+In-process request metrics: stage latency histograms and counters.
+
+Stages are timed with `Metrics.timer(stage)` around each step of handling a
+request (parsing, tokenizing, the forward pass, picking the next id, ...).
+Durations go into fixed, log-spaced buckets - an observation is a bisect and
+two additions under a lock, about a microsecond - from which p50/p90/p99 are
+interpolated, and which `render` writes as Prometheus histograms. With
+`enabled=False` `timer` returns one shared no-op context manager and the
+counters do nothing, so the hooks can stay in place at no measurable cost.
+Values are per process.
+
+`trace()` additionally collects the stages timed by the current thread, for
+the breakdown of a single profiled request; it works with `enabled=False`.
+"""
+
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Bucket upper bounds in seconds: 10 µs .. ~30 s, two per doubling.
+BUCKETS = tuple(1e-5 * 2 ** (i / 2) for i in range(44))
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram:
+    def __init__(self, bounds: Tuple[float, ...] = BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate, interpolating linearly inside the bucket that holds it."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    def __init__(self, enabled: bool = True, prefix: str = "nwp"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Histogram] = defaultdict(Histogram)
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+        self._local = threading.local()
+        # Traces open in any thread; the thread-local is only read while > 0
+        self._tracing = 0
+
+    def timer(self, stage: str):
+        """Context manager adding the duration of its block to `stage`."""
+        if self.enabled or (self._tracing and getattr(self._local, "spans", None) is not None):
+            return _Timer(self, stage)
+        return _NULL_TIMER
+
+    @contextmanager
+    def trace(self):
+        """Collect the (stage, seconds) observed by this thread inside the block."""
+        spans: List[Tuple[str, float]] = []
+        outer = getattr(self._local, "spans", None)
+        self._local.spans = spans
+        with self._lock:
+            self._tracing += 1
+        try:
+            yield spans
+        finally:
+            self._local.spans = outer
+            with self._lock:
+                self._tracing -= 1
+
+    def observe(self, stage: str, seconds: float):
+        if self._tracing:
+            spans = getattr(self._local, "spans", None)
+            if spans is not None:
+                spans.append((stage, seconds))
+        if self.enabled:
+            with self._lock:
+                self._stages[stage].observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if self.enabled:
+            key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+            with self._lock:
+                self._counters[key] += value
+
+    def stats(self) -> Dict:
+        """p50/p90/p99 (ms) and count of every stage, for JSON."""
+        with self._lock:
+            return {
+                stage: {
+                    "count": h.count,
+                    **{f"p{int(q * 100)}_ms": round(h.quantile(q) * 1000, 3) for q in QUANTILES},
+                }
+                for stage, h in sorted(self._stages.items())
+            }
+
+    def render(self, gauges: Iterable[Tuple[str, str, float]] = ()) -> str:
+        """Prometheus text exposition; `gauges` adds (name, help, value) lines."""
+        p = self.prefix
+        lines: List[str] = []
+        with self._lock:
+            stages = sorted(
+                (stage, h.counts[:], h.count, h.sum, [h.quantile(q) for q in QUANTILES])
+                for stage, h in self._stages.items()
+            )
+            counters = sorted(self._counters.items())
+
+        lines += [
+            f"# HELP {p}_stage_duration_seconds Time spent per request handling stage.",
+            f"# TYPE {p}_stage_duration_seconds histogram",
+        ]
+        for stage, counts, count, total, _ in stages:
+            cumulative = 0
+            for bound, n in zip(BUCKETS, counts):
+                cumulative += n
+                lines.append(f'{p}_stage_duration_seconds_bucket{{stage="{stage}",le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{p}_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{p}_stage_duration_seconds_sum{{stage="{stage}"}} {total:.9g}')
+            lines.append(f'{p}_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+
+        lines += [
+            f"# HELP {p}_stage_duration_quantile_seconds p50/p90/p99 per stage, estimated from the histogram.",
+            f"# TYPE {p}_stage_duration_quantile_seconds gauge",
+        ]
+        for stage, _, _, _, quantiles in stages:
+            for q, value in zip(QUANTILES, quantiles):
+                lines.append(f'{p}_stage_duration_quantile_seconds{{stage="{stage}",quantile="{q}"}} {value:.9g}')
+
+        names = sorted({name for (name, _), _ in counters})
+        for name in names:
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            for (counter, labels), value in counters:
+                if counter == name:
+                    lines.append(f"{p}_{name}_total{_labels(labels)} {value:g}")
+
+        for name, help_text, value in gauges:
+            lines += [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} gauge", f"{p}_{name} {value:g}"]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,267 @@
+"""
+Pure-NumPy inference for the served Embedding -> LSTM -> Dense(softmax) model.
+
+`export_keras_model` writes the artifact bundle: one versioned `.npz` with the
+trained weights, the tokenizer vocabulary and the model config (`SEQ_LEN`,
+`MAX_VOCAB`, ...). `NumpyLSTM.load` reads it back and runs the forward pass
+with NumPy only, so the server can start without the raw corpus and answer
+predictions without importing TensorFlow. Outputs match `model.predict` to within `PARITY_ATOL` (absolute,
+on the softmax probabilities), which is float32 round-off for this network.
+
+Besides the full-window `predict`, the engine exposes the LSTM cell as a
+single-step function (`initial_state` / `step` / `output`) so a decoder can
+carry `(h, c)` forward and feed one new token per generated word.
+
+`write_flat` converts an engine into a flat binary file (a sectioned file, see
+sectioned_file.py, of float32 arrays) that `load_flat` memory-maps read-only, so
+pre-forked server workers share one copy of the weights through the page
+cache.
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from fast_tokenizer import compile_splitter
+from sectioned_file import map_sections, read_header, write_sections
+
+
+ENGINE_FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+
+FLAT_MAGIC = b"NWPFLAT2"
+FLAT_ARRAYS = ("input_table", "recurrent_kernel", "dense_kernel", "dense_bias")
+PARITY_ATOL = 1e-5
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    x = x - x.max(axis=-1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=-1, keepdims=True)
+    return x
+
+
+def _keras_weights(model) -> Dict[str, np.ndarray]:
+    embedding, lstm, dense = model.layers
+    lstm_config = lstm.get_config()
+    if lstm_config.get("activation") != "tanh" or lstm_config.get("recurrent_activation") != "sigmoid":
+        raise ValueError("only tanh/sigmoid LSTM layers can be exported")
+    if dense.get_config().get("activation") != "softmax":
+        raise ValueError("the output layer must be a softmax Dense layer")
+
+    (embeddings,) = embedding.get_weights()
+    kernel, recurrent_kernel, bias = lstm.get_weights()
+    dense_kernel, dense_bias = dense.get_weights()
+    return {
+        "embeddings": embeddings.astype(np.float32),
+        "kernel": kernel.astype(np.float32),
+        "recurrent_kernel": recurrent_kernel.astype(np.float32),
+        "bias": bias.astype(np.float32),
+        "dense_kernel": dense_kernel.astype(np.float32),
+        "dense_bias": dense_bias.astype(np.float32),
+    }
+
+
+def bundle_id(weights: Dict[str, np.ndarray], words: List[str]) -> str:
+    """Content id of a bundle: a hash of its weights and vocabulary."""
+    digest = hashlib.sha256()
+    for name in sorted(weights):
+        digest.update(weights[name].tobytes())
+    digest.update("\n".join(words).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def keras_bundle_id(model, words: List[str]) -> str:
+    """The bundle id `export_keras_model` would record for `model` and `words`."""
+    return bundle_id(_keras_weights(model), words)
+
+
+def export_keras_model(model, tokenizer, path: str):
+    """Write the weights of `model` and the vocabulary of `tokenizer` to `path`."""
+    weights = _keras_weights(model)
+
+    # Only ids below num_words can come out of texts_to_sequences, so the
+    # rest of word_index is not needed at serve time.
+    num_words = tokenizer.num_words or (len(tokenizer.word_index) + 1)
+    words = [""] * min(num_words, len(tokenizer.word_index) + 1)
+    for word, idx in tokenizer.word_index.items():
+        if idx < len(words):
+            words[idx] = word
+
+    seq_len = int(model.input_shape[1]) if model.input_shape[1] else None
+    meta = {
+        "format_version": ENGINE_FORMAT_VERSION,
+        "bundle_id": bundle_id(weights, words),
+        "config": {
+            "seq_len": seq_len,
+            "max_vocab": tokenizer.num_words,
+            "vocab_size": int(weights["embeddings"].shape[0]),
+            "embed_dim": int(weights["embeddings"].shape[1]),
+            "lstm_units": int(weights["recurrent_kernel"].shape[0]),
+        },
+        "seq_len": seq_len,
+        "num_words": tokenizer.num_words,
+        "oov_token": tokenizer.oov_token,
+        "filters": tokenizer.filters,
+        "lower": tokenizer.lower,
+        "split": tokenizer.split,
+        "char_level": tokenizer.char_level,
+    }
+    np.savez(path, words=np.array(words), meta=np.array(json.dumps(meta)), **weights)
+
+
+class EngineTokenizer:
+    """The subset of the Keras `Tokenizer` API the server uses, with the same ids."""
+
+    def __init__(self, words: List[str], meta: Dict):
+        self.words = list(words)
+        self.word_index = {w: i for i, w in enumerate(words) if w}
+        self.num_words = meta["num_words"]
+        self.oov_token = meta["oov_token"]
+        self.filters = meta["filters"]
+        self.lower = meta["lower"]
+        self.split = meta["split"]
+        self.char_level = meta["char_level"]
+        self._oov_index = self.word_index.get(self.oov_token) if self.oov_token is not None else None
+        self._words = compile_splitter(self.filters, self.lower, self.split, self.char_level)
+
+    def texts_to_sequences(self, texts: List[str]) -> List[List[int]]:
+        sequences = []
+        for text in texts:
+            seq = []
+            for w in self._words(text):
+                i = self.word_index.get(w)
+                if i is not None and (not self.num_words or i < self.num_words):
+                    seq.append(i)
+                elif self._oov_index is not None:
+                    seq.append(self._oov_index)
+            sequences.append(seq)
+        return sequences
+
+
+def read_bundle_meta(path: str) -> Dict:
+    """Meta of a `.npz` bundle or flat file without loading the weights."""
+    header = read_header(path, FLAT_MAGIC)
+    if header is not None:
+        return header["meta"]
+    with np.load(path, allow_pickle=False) as data:
+        return json.loads(str(data["meta"]))
+
+
+class NumpyLSTM:
+    """NumPy forward pass with the same `predict` call shape as a Keras model."""
+
+    def __init__(
+        self,
+        embeddings: Optional[np.ndarray],
+        kernel: Optional[np.ndarray],
+        recurrent_kernel: np.ndarray,
+        bias: Optional[np.ndarray],
+        dense_kernel: np.ndarray,
+        dense_bias: np.ndarray,
+        tokenizer: Optional[EngineTokenizer] = None,
+        seq_len: Optional[int] = None,
+        meta: Optional[Dict] = None,
+        input_table: Optional[np.ndarray] = None,
+    ):
+        self.embeddings = embeddings
+        self.kernel = kernel
+        self.recurrent_kernel = recurrent_kernel
+        self.bias = bias
+        self.dense_kernel = dense_kernel
+        self.dense_bias = dense_bias
+        self.tokenizer = tokenizer
+        self.seq_len = seq_len
+        self.meta = meta or {}
+        self.units = recurrent_kernel.shape[0]
+        # Fold the embedding into the input projection: row t of this table is
+        # embeddings[t] @ kernel + bias, so each timestep is a single gather.
+        self.input_table = input_table if input_table is not None else embeddings @ kernel + bias
+
+    @classmethod
+    def from_keras(cls, model) -> "NumpyLSTM":
+        """Engine sharing the weights of an in-memory Keras model (no tokenizer)."""
+        return cls(**_keras_weights(model), seq_len=model.input_shape[1])
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyLSTM":
+        """Load a `.npz` bundle, or memory-map a flat file written by `write_flat`."""
+        if read_header(path, FLAT_MAGIC) is not None:
+            return cls.load_flat(path)
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("format_version") not in SUPPORTED_FORMAT_VERSIONS:
+                raise ValueError(f"unsupported engine file version: {meta.get('format_version')}")
+            return cls(
+                data["embeddings"],
+                data["kernel"],
+                data["recurrent_kernel"],
+                data["bias"],
+                data["dense_kernel"],
+                data["dense_bias"],
+                tokenizer=EngineTokenizer([str(w) for w in data["words"]], meta),
+                seq_len=meta["seq_len"],
+                meta=meta,
+            )
+
+    @classmethod
+    def load_flat(cls, path: str) -> "NumpyLSTM":
+        header, arrays = map_sections(path, FLAT_MAGIC)
+        meta = header["meta"]
+        return cls(
+            None,
+            None,
+            arrays["recurrent_kernel"],
+            None,
+            arrays["dense_kernel"],
+            arrays["dense_bias"],
+            tokenizer=EngineTokenizer(header["words"], meta),
+            seq_len=meta["seq_len"],
+            meta=meta,
+            input_table=arrays["input_table"],
+        )
+
+    def write_flat(self, path: str):
+        """Write the arrays the forward pass reads, plus vocabulary and meta."""
+        arrays = {name: np.ascontiguousarray(getattr(self, name), dtype=np.float32) for name in FLAT_ARRAYS}
+        header = {"meta": self.meta, "words": self.tokenizer.words if self.tokenizer else []}
+        write_sections(path, FLAT_MAGIC, header, arrays)
+
+    def _cell(self, x_proj: np.ndarray, h: np.ndarray, c: np.ndarray):
+        # Keras gate order: input, forget, cell, output
+        z = x_proj + h @ self.recurrent_kernel
+        u = self.units
+        i = _sigmoid(z[:, :u])
+        f = _sigmoid(z[:, u : 2 * u])
+        g = np.tanh(z[:, 2 * u : 3 * u])
+        o = _sigmoid(z[:, 3 * u :])
+        c = f * c + i * g
+        h = o * np.tanh(c)
+        return h, c
+
+    def initial_state(self, x: np.ndarray):
+        """`(h, c)` after running a `(N, T)` batch of token ids from a zero state."""
+        x = np.asarray(x, dtype=np.int64)
+        h = np.zeros((x.shape[0], self.units), dtype=np.float32)
+        c = np.zeros_like(h)
+        for t in range(x.shape[1]):
+            h, c = self._cell(self.input_table[x[:, t]], h, c)
+        return h, c
+
+    def step(self, token_ids: np.ndarray, h: np.ndarray, c: np.ndarray):
+        """Advance `(h, c)` by one token per row."""
+        return self._cell(self.input_table[np.asarray(token_ids, dtype=np.int64)], h, c)
+
+    def output(self, h: np.ndarray) -> np.ndarray:
+        """Next-token probabilities for a batch of hidden states."""
+        return _softmax(h @ self.dense_kernel + self.dense_bias)
+
+    def predict(self, x, batch_size=None, verbose=0) -> np.ndarray:
+        """Next-token probabilities for a `(N, SEQ_LEN)` batch of token ids."""
+        return self.output(self.initial_state(x)[0])
@@ -0,0 +1,111 @@
+"""
+In-process LRU cache of next-token distributions.
+
+The model only ever sees the last SEQ_LEN token ids, so the padded context
+tuple is a complete cache key. Each entry keeps the top-k next-token ids and
+their probabilities (not the full softmax row), which is all that decoding
+needs. The cache is bounded by an approximate byte budget, evicts the least
+recently used entries, and empties itself when it is used with a different
+model or tokenizer object than the one that filled it.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+# Rough per-entry cost of the key tuple, OrderedDict slot and array headers.
+ENTRY_OVERHEAD_BYTES = 320
+
+
+def top_k(probs: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Ids and probabilities of the `k` largest entries of `probs`, best first.
+
+    Uses np.argpartition instead of a full sort; ties keep the lowest id first
+    so the top entry always equals np.argmax(probs).
+    """
+    k = min(k, probs.shape[-1])
+    if k < probs.shape[-1]:
+        idx = np.sort(np.argpartition(probs, -k)[-k:])
+    else:
+        idx = np.arange(probs.shape[-1])
+    idx = idx[np.argsort(-probs[idx], kind="stable")]
+    return idx.astype(np.int32), probs[idx].astype(np.float32)
+
+
+class PredictionCache:
+    def __init__(self, max_bytes: int, k: int):
+        self.max_bytes = max_bytes
+        self.k = k
+        self._entries: "OrderedDict[tuple, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._model = None
+        self._tokenizer = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def bind(self, model, tokenizer):
+        """Drop every entry if `model` or `tokenizer` is not the one cached for."""
+        with self._lock:
+            if model is self._model and tokenizer is self._tokenizer:
+                return
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            # Holding the references also keeps their ids from being reused.
+            self._model = model
+            self._tokenizer = tokenizer
+
+    def get(self, key: tuple) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, probs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Store the top-k of a softmax row under `key` and return it."""
+        entry = top_k(probs, self.k)
+        size = entry[0].nbytes + entry[1].nbytes + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return entry
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[0].nbytes + old[1].nbytes + ENTRY_OVERHEAD_BYTES
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[0].nbytes + evicted[1].nbytes + ENTRY_OVERHEAD_BYTES
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "top_k": self.k,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
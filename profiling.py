@@ -0,0 +1,115 @@
+"""
+cProfile captures of single requests, kept in a bounded on-disk ring.
+
+A profiled request runs under `cProfile` in its own thread; the stats are
+dumped to `<directory>/<time>-<pid>-<seq>-<label>.prof` (readable with
+`python -m pstats` or snakeviz) and the oldest files beyond `keep` are
+removed. Only one request is profiled at a time per process - `start`
+returns None while another capture is running - so a burst of profiled
+requests cannot pile up profiler overhead. `Sampler` picks every Nth
+request for automatic capture.
+"""
+
+import cProfile
+import itertools
+import os
+import pstats
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class ProfileRing:
+    def __init__(self, directory: str, keep: int):
+        self.directory = directory
+        self.keep = max(1, keep)
+        self._busy = threading.Lock()
+        self._seq = itertools.count(1)
+        self.saved = 0
+        self.skipped_busy = 0
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """An enabled profiler for the calling thread, or None if one is running."""
+        if not self._busy.acquire(blocking=False):
+            self.skipped_busy += 1
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop(self, profiler: cProfile.Profile, label: str) -> str:
+        """Disable `profiler`, write it to the ring and return the file name."""
+        profiler.disable()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(self._seq)}-{label}.prof"
+            profiler.dump_stats(os.path.join(self.directory, name))
+            self.saved += 1
+            self._trim()
+            return name
+        finally:
+            self._busy.release()
+
+    def _trim(self):
+        for name in self.names()[self.keep :]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def names(self) -> List[str]:
+        """Stored profiles, newest first."""
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".prof")]
+        except OSError:
+            return []
+        entries.sort(key=lambda e: (e.stat().st_mtime, e.name), reverse=True)
+        return [e.name for e in entries]
+
+    def path(self, name: str) -> Optional[str]:
+        """Full path of a stored profile; None for unknown or unsafe names."""
+        if os.path.basename(name) != name or name not in self.names():
+            return None
+        return os.path.join(self.directory, name)
+
+    def stats(self) -> Dict:
+        return {
+            "directory": self.directory,
+            "keep": self.keep,
+            "stored": len(self.names()),
+            "saved": self.saved,
+            "skipped_busy": self.skipped_busy,
+        }
+
+
+def hotspots(profiler: cProfile.Profile, limit: int = 10) -> List[Dict]:
+    """The `limit` functions with the most own time, for a JSON summary."""
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{os.path.basename(filename)}:{line}({name})",
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+class Sampler:
+    """True for every `every`-th call (never when `every` <= 0)."""
+
+    def __init__(self, every: int):
+        self.every = every
+        self._count = itertools.count(1)
+        self.sampled = 0
+
+    def sample(self) -> bool:
+        if self.every <= 0:
+            return False
+        # itertools.count is atomic under the GIL
+        if next(self._count) % self.every:
+            return False
+        self.sampled += 1
+        return True
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Prefix lookup latency of the memory-mapped vocabulary (/complete)
+Writes a synthetic vocabulary of VOCAB_WORDS words, checks every prefix
+lookup against a brute-force scan, and times lookups for 1-4 character
+prefixes, which must stay well under a millisecond
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from vocab import Vocab, write_vocab  # noqa: E402
+
+VOCAB_WORDS = int(os.environ.get("VOCAB_WORDS", "50000"))
+MAX_MATCHES = int(os.environ.get("COMPLETE_MAX_MATCHES", "2000"))
+CONFIG = {
+    "num_words": None,
+    "oov_token": "<OOV>",
+    "filters": '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n',
+    "lower": True,
+    "split": " ",
+    "char_level": False,
+}
+
+
+def synthetic_words(n, rng):
+    """n distinct lowercase words, 2-12 letters, with English-like first letters"""
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    first = np.array([8.2, 1.5, 2.8, 4.3, 12.7, 2.2, 2.0, 6.1, 7.0, 0.2, 0.8, 4.0, 2.4,
+                      6.7, 7.5, 1.9, 0.1, 6.0, 6.3, 9.1, 2.8, 1.0, 2.4, 0.2, 2.0, 0.1])
+    words = {}
+    while len(words) < n:
+        length = rng.integers(2, 13)
+        word = rng.choice(letters, p=first / first.sum()) + "".join(rng.choice(letters, size=length - 1))
+        words.setdefault(word, None)
+    return list(words)
+
+
+def main():
+    print("=" * 60)
+    print(f"🔎 PREFIX COMPLETION BENCHMARK ({VOCAB_WORDS:,} words)")
+    print("=" * 60)
+    rng = np.random.default_rng(0)
+    words = synthetic_words(VOCAB_WORDS, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vocab.bin")
+        write_vocab(path, ["", "<OOV>"] + words, CONFIG)
+        vocab = Vocab.load(path)
+        print(f"Vocabulary: {os.path.getsize(path) / 1024:.1f} KB")
+
+        ok = True
+        for length in range(1, 5):
+            prefixes = sorted({w[:length] for w in rng.choice(words, size=200)})
+            for prefix in prefixes[:20]:
+                expected = [i + 2 for i, w in enumerate(words) if w.startswith(prefix)]
+                ok = ok and vocab.ids_with_prefix(prefix).tolist() == expected
+                ok = ok and vocab.ids_with_prefix(prefix, MAX_MATCHES).tolist() == expected[:MAX_MATCHES]
+        print(f"Matches brute-force scan: {'✅' if ok else '❌'}\n")
+
+        print(f"{'prefix':>8}  {'matches':>9}  {'p50 µs':>9}  {'p99 µs':>9}")
+        worst = 0.0
+        for length in range(1, 5):
+            prefixes = [w[:length] for w in rng.choice(words, size=500)]
+            times, matches = [], []
+            for prefix in prefixes:
+                start = time.perf_counter()
+                ids = vocab.ids_with_prefix(prefix, MAX_MATCHES)
+                times.append((time.perf_counter() - start) * 1e6)
+                matches.append(len(ids))
+            p50, p99 = np.percentile(times, [50, 99])
+            worst = max(worst, p99)
+            print(f"{length:>7}c  {np.mean(matches):9.1f}  {p50:9.1f}  {p99:9.1f}")
+        del vocab
+
+    print("=" * 60)
+    fast = worst < 1000
+    print(f"{'🎉' if fast else '❌'} p99 lookup {worst:.0f} µs (target < 1000 µs)")
+    return ok and fast
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Overhead of the per-stage latency metrics on /predict
+Sends the same /predict requests through the Flask test client with the
+metrics hooks enabled and disabled (interleaved rounds, so drift hits both
+alike) and reports the per-request difference. The cache, continuation
+index and single-flight are turned off so every request runs the model.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["ENABLE_BATCHING"] = "0"
+os.environ["PREDICTION_CACHE_MB"] = "0"
+os.environ["SINGLE_FLIGHT"] = "0"
+os.environ["CONTINUATION_INDEX_FILE"] = ""
+
+import server  # noqa: E402
+
+PROMPTS = ["the quick brown", "once upon a time", "i want to", "machine learning is", "in the"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="requests per round and setting")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--num-words", type=int, default=3)
+    parser.add_argument("--decode-mode", default=server.DECODE_MODE, choices=server.DECODE_MODES)
+    return parser.parse_args()
+
+
+def run(client, args):
+    """Per-request latencies in µs"""
+    times = []
+    for i in range(args.requests):
+        body = {"text": PROMPTS[i % len(PROMPTS)], "num_words": args.num_words, "decode_mode": args.decode_mode}
+        start = time.perf_counter()
+        response = client.post("/predict", json=body)
+        times.append((time.perf_counter() - start) * 1e6)
+        if response.status_code != 200:
+            raise RuntimeError(response.get_json())
+    return times
+
+
+def timer_cost_us(n=100000):
+    """Cost of one enabled timer block in µs, measured on a scratch instance"""
+    metrics = server.Metrics()
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.timer("stage"):
+            pass
+    return (time.perf_counter() - start) * 1e6 / n
+
+
+def main():
+    args = parse_args()
+    print("=" * 60)
+    print("⏱️  METRICS OVERHEAD BENCHMARK")
+    print("=" * 60)
+    if not server.wait_until_ready():
+        print(f"❌ Model failed to load: {server._startup['error']}")
+        return False
+
+    client = server.app.test_client()
+    run(client, args)  # warm up
+    times = {True: [], False: []}
+    for _ in range(args.rounds):
+        for enabled in (True, False):
+            server._metrics.enabled = enabled
+            times[enabled] += run(client, args)
+    server._metrics.enabled = True
+
+    print(f"{args.rounds} x {args.requests} requests per setting, {args.num_words} words, {args.decode_mode}\n")
+    print(f"{'metrics':>8}  {'p50 µs':>9}  {'p99 µs':>9}  {'mean µs':>9}")
+    for enabled in (False, True):
+        p50, p99 = np.percentile(times[enabled], [50, 99])
+        print(f"{'on' if enabled else 'off':>8}  {p50:9.1f}  {p99:9.1f}  {np.mean(times[enabled]):9.1f}")
+
+    off, on = np.median(times[False]), np.median(times[True])
+    overhead = on - off
+    stages = sum(s["count"] for s in server._metrics.stats().values()) / (args.rounds * args.requests + args.requests)
+    cost = timer_cost_us()
+    print(f"\nStage observations per request: {stages:.1f} x {cost:.2f} µs = {stages * cost:.1f} µs")
+    print("=" * 60)
+    print(f"📊 Measured overhead: {overhead:+.1f} µs per request ({overhead / off:+.2%} of the median)")
+    print(f"📊 Expected from the hooks: {stages * cost:.1f} µs ({stages * cost / off:.2%})")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
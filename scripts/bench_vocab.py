@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Startup and per-request cost of the vocabulary
+Unpickling tokenizer.pkl + rebuilding index_word per request (the old path)
+vs. memory-mapping vocab.bin and looking words up in place
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import corpus  # noqa: E402
+from vocab import Vocab, write_vocab_from_tokenizer  # noqa: E402
+
+DATASET_FILE = os.environ.get("DATASET_FILE", "data/dataset_10000.txt")
+TOKENIZER_FILE = os.environ.get("TOKENIZER_FILE", "tokenizer.pkl")
+PROMPTS = ["the", "machine learning is", "the quick brown fox jumps over", "students learn"]
+REPEATS = 20
+
+
+def timed(fn, repeats=REPEATS):
+    """Best wall time of `fn` in ms, and the bytes its result keeps alive"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result = fn()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best * 1000, retained
+
+
+def old_request(tokenizer, prompt, predicted_ids):
+    """What greedy_predict did per call: rebuild index_word, then map ids"""
+    index_word = {v: k for k, v in tokenizer.word_index.items()}
+    tokens = tokenizer.texts_to_sequences([prompt])[0]
+    return tokens, [index_word.get(i) for i in predicted_ids]
+
+
+def new_request(vocab, prompt, predicted_ids):
+    tokens = vocab.texts_to_sequences([prompt])[0]
+    return tokens, [vocab.word(i) for i in predicted_ids]
+
+
+def per_request(fn, arg):
+    """Mean time (µs) and peak allocation (bytes) over PROMPTS"""
+    predicted_ids = list(range(1, 11))
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for prompt in PROMPTS:
+            fn(arg, prompt, predicted_ids)
+    elapsed_us = (time.perf_counter() - start) / (REPEATS * len(PROMPTS)) * 1e6
+    peak = 0
+    for prompt in PROMPTS:
+        tracemalloc.start()
+        fn(arg, prompt, predicted_ids)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return elapsed_us, peak
+
+
+def main():
+    print("=" * 60)
+    print("📚 VOCABULARY BENCHMARK: pickle vs. memory-mapped vocab")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    from tensorflow.keras.preprocessing.text import Tokenizer  # noqa: F401  (unpickling needs it)
+    import_ms = (time.perf_counter() - start) * 1000
+
+    if not os.path.exists(TOKENIZER_FILE):
+        print(f"{TOKENIZER_FILE} not found, fitting on {DATASET_FILE}")
+        with open(TOKENIZER_FILE, "wb") as f:
+            pickle.dump(corpus.fit_tokenizer(DATASET_FILE, 5000), f)
+
+    with open(TOKENIZER_FILE, "rb") as f:
+        tokenizer = pickle.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vocab.bin")
+        write_vocab_from_tokenizer(path, tokenizer)
+
+        def load_pickle():
+            with open(TOKENIZER_FILE, "rb") as f:
+                return pickle.load(f)
+
+        pickle_ms, pickle_bytes = timed(load_pickle)
+        vocab_ms, vocab_bytes = timed(lambda: Vocab.load(path))
+        vocab = Vocab.load(path)
+
+        text = corpus.FALLBACK_TEXT
+        if os.path.exists(DATASET_FILE):
+            with open(DATASET_FILE, "r", encoding="utf-8", errors="ignore") as f:
+                text = f.read()
+        lines = [line for line in text.splitlines() if line.strip()]
+        same = tokenizer.texts_to_sequences(lines) == vocab.texts_to_sequences(lines)
+        same = same and all(vocab.word(i) == tokenizer.index_word[i] for i in range(1, len(vocab)))
+
+        print(f"Tokenizer: {TOKENIZER_FILE} ({os.path.getsize(TOKENIZER_FILE) / 1024:.1f} KB, "
+              f"{len(tokenizer.word_index):,} words)")
+        print(f"Vocabulary: {len(vocab) - 1:,} ids ({os.path.getsize(path) / 1024:.1f} KB)")
+        print(f"Identical ids and words: {'✅' if same else '❌'}\n")
+
+        print("Startup")
+        print(f"  import Keras Tokenizer   {import_ms:9.1f} ms  (needed only to unpickle)")
+        print(f"  pickle.load              {pickle_ms:9.2f} ms  {pickle_bytes / 1024:9.1f} KB retained")
+        print(f"  Vocab.load (mmap)        {vocab_ms:9.2f} ms  {vocab_bytes / 1024:9.1f} KB retained\n")
+
+        old_us, old_peak = per_request(old_request, tokenizer)
+        new_us, new_peak = per_request(new_request, vocab)
+        print("Per request (tokenize prompt + map 10 predicted ids)")
+        print(f"  index_word rebuild       {old_us:9.1f} µs  {old_peak / 1024:9.1f} KB peak")
+        print(f"  vocab lookups            {new_us:9.1f} µs  {new_peak / 1024:9.1f} KB peak")
+        del vocab
+    return same
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Memory and time comparison of training-window construction
+Python list building (the old make_sequences) vs. strided sliding-window views
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATASET_FILE", "data/dataset_10000.txt")
+os.environ["ENABLE_BATCHING"] = "0"
+
+import server  # noqa: E402
+
+
+def list_windows(tokens):
+    """The previous implementation: lists of lists, then np.array copies"""
+    inputs, targets = [], []
+    for i in range(server.SEQ_LEN, len(tokens)):
+        inputs.append(tokens[i - server.SEQ_LEN : i])
+        targets.append(tokens[i])
+    return np.array(inputs), np.array(targets)
+
+
+def view_windows(tokens):
+    return server.sliding_windows(np.asarray(tokens, dtype=np.int32))
+
+
+def measure(fn, tokens):
+    tracemalloc.start()
+    start = time.perf_counter()
+    x, y = fn(tokens)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return x, y, elapsed, peak
+
+
+def main():
+    print("=" * 60)
+    print("📐 SLIDING-WINDOW CONSTRUCTION BENCHMARK")
+    print("=" * 60)
+    if not server.wait_until_ready():
+        print(f"❌ Model failed to load: {server._startup['error']}")
+        return False
+
+    text = server.read_dataset(server.DATASET_FILE)
+    tokens = server._vocab.texts_to_sequences([text])[0]
+    print(f"Dataset: {server.DATASET_FILE} ({len(tokens):,} tokens, SEQ_LEN={server.SEQ_LEN})")
+    print(f"Token ids as int32: {len(tokens) * 4 / 1024:.1f} KB\n")
+
+    x_old, y_old, t_old, m_old = measure(list_windows, tokens)
+    x_new, y_new, t_new, m_new = measure(view_windows, tokens)
+    same = np.array_equal(x_old, x_new) and np.array_equal(y_old, y_new)
+
+    print(f"{'Method':<16}{'Time (ms)':>12}{'Peak (KB)':>14}")
+    print(f"{'list building':<16}{t_old * 1000:>12.2f}{m_old / 1024:>14.1f}")
+    print(f"{'strided view':<16}{t_new * 1000:>12.2f}{m_new / 1024:>14.1f}")
+    print(f"\nSpeedup: {t_old / max(t_new, 1e-9):.0f}x, memory: {m_old / max(m_new, 1):.0f}x less")
+    print(f"{'✅' if same else '❌'} Identical windows and targets: {same}")
+    return same
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite over the bundled datasets, written to JSON for graph.py
+For each dataset, in fresh processes and with artifacts in a temporary
+directory: tokenizer fit and encoding time, training-window construction,
+training time per epoch, single-request /predict latency, /predict/batch
+throughput and peak memory. Results go to --output together with the
+environment they were measured in; --compare flags regressions against a
+saved baseline.
+"""
+
+import argparse
+import importlib.metadata
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DATASETS = ["data/dataset_500.txt", "data/dataset_1000.txt", "data/dataset_8000.txt", "data/dataset_10000.txt"]
+SCHEMA = 1
+
+# (path in a dataset's results, label, "lower"/"higher" is better, smallest
+# absolute change that counts - below it differences are timer noise)
+COMPARED = [
+    (("tokenize", "fit_ms"), "tokenizer fit (ms)", "lower", 1.0),
+    (("tokenize", "encode_ms"), "encode (ms)", "lower", 1.0),
+    (("windows", "copy_ms"), "windows copy (ms)", "lower", 0.5),
+    (("training", "mean_epoch_s"), "epoch (s)", "lower", 0.05),
+    (("latency_ms", "p50"), "latency p50 (ms)", "lower", 0.05),
+    (("latency_ms", "p99"), "latency p99 (ms)", "lower", 0.1),
+    (("throughput", "prompts_per_s"), "batch prompts/s", "higher", 1.0),
+    (("peak_rss_mb", "prepare"), "peak RSS prepare (MB)", "lower", 5.0),
+    (("peak_rss_mb", "serve"), "peak RSS serve (MB)", "lower", 5.0),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--datasets", nargs="+", default=DATASETS)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--epochs", type=int, default=1, help="timed training epochs (0 skips training)")
+    parser.add_argument("--requests", type=int, default=200, help="single /predict requests per dataset")
+    parser.add_argument("--num-words", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=64, help="prompts per /predict/batch call")
+    parser.add_argument("--batch-rounds", type=int, default=5)
+    parser.add_argument("--backend", default="numpy", choices=["numpy", "keras"], help="INFERENCE_BACKEND served")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", metavar="BASELINE", help="results JSON to check for regressions")
+    parser.add_argument("--current", metavar="RESULTS", help="compare this results JSON instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change reported as a regression")
+    parser.add_argument("--worker", choices=["prepare", "serve"], help=argparse.SUPPRESS)
+    parser.add_argument("--dataset", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def artifact_env(dataset, workdir, backend):
+    """Environment for server.py that keeps every artifact inside `workdir`"""
+    return {
+        "DATASET_FILE": dataset,
+        "MODEL_FILE": os.path.join(workdir, "model.h5"),
+        "TOKENIZER_FILE": os.path.join(workdir, "tokenizer.pkl"),
+        "ENGINE_FILE": os.path.join(workdir, "model_weights.npz"),
+        "VOCAB_FILE": os.path.join(workdir, "vocab.bin"),
+        "TOKEN_CACHE_DIR": os.path.join(workdir, "token_cache"),
+        "CONTINUATION_INDEX_FILE": "",
+        "INFERENCE_BACKEND": backend,
+        "ENABLE_BATCHING": "0",
+        "WARMUP_PROMPTS": "",
+    }
+
+
+def run_prepare(args):
+    """Tokenize, build windows and train in this process; print a JSON line"""
+    # The server builds an untrained model at startup (EPOCHS=0); the timed
+    # training below replaces it.
+    os.environ.update(artifact_env(args.dataset, args.workdir, "keras"), EPOCHS="0")
+    import server
+    import corpus
+    from numpy_lstm import export_keras_model
+
+    if not server.wait_until_ready():
+        raise RuntimeError(server._startup["error"])
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(args.seed)
+    result = {
+        "config": {
+            "seq_len": server.SEQ_LEN,
+            "max_vocab": server.MAX_VOCAB,
+            "embed_dim": server.EMBED_DIM,
+            "lstm_units": server.LSTM_UNITS,
+            "batch_size": server.BATCH_SIZE,
+        }
+    }
+
+    start = time.perf_counter()
+    tokenizer = corpus.fit_tokenizer(args.dataset, server.MAX_VOCAB, oov_token="<OOV>")
+    fit_ms = (time.perf_counter() - start) * 1000
+    text = server.read_dataset(args.dataset)
+    start = time.perf_counter()
+    ids = server.token_ids(tokenizer, text)
+    encode_ms = (time.perf_counter() - start) * 1000
+    vocab_size = min(server.MAX_VOCAB, len(tokenizer.word_index) + 1)
+    result["bytes"] = os.path.getsize(args.dataset)
+    result["tokens"] = len(ids)
+    result["vocab_size"] = vocab_size
+    result["tokenize"] = {"fit_ms": round(fit_ms, 3), "encode_ms": round(encode_ms, 3)}
+
+    start = time.perf_counter()
+    x, _ = server.sliding_windows(ids)
+    view_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    np.ascontiguousarray(x)
+    copy_ms = (time.perf_counter() - start) * 1000
+    result["windows"] = {"count": len(x), "view_ms": round(view_ms, 4), "copy_ms": round(copy_ms, 3)}
+
+    epoch_s = []
+
+    class EpochTimer(tf.keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self.started = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            epoch_s.append(round(time.perf_counter() - self.started, 3))
+
+    # A fresh model rather than the one the server just saved
+    server.MODEL_FILE = os.path.join(args.workdir, "fresh.h5")
+    model = server.build_or_load_model(vocab_size)
+    if args.epochs > 0:
+        model.fit(server.make_dataset(ids, server.BATCH_SIZE), epochs=args.epochs, verbose=0, callbacks=[EpochTimer()])
+    # With --epochs 0 the serve worker times the untrained model
+    model.save(os.path.join(args.workdir, "model.h5"))
+    with open(os.path.join(args.workdir, "tokenizer.pkl"), "wb") as f:
+        pickle.dump(tokenizer, f)
+    export_keras_model(model, tokenizer, os.path.join(args.workdir, "model_weights.npz"))
+    result["training"] = {
+        "epochs": len(epoch_s),
+        "epoch_s": epoch_s,
+        "mean_epoch_s": round(float(np.mean(epoch_s)), 3) if epoch_s else None,
+    }
+    result["tensorflow"] = tf.__version__
+    result["peak_rss_kb"] = corpus.peak_rss_kb()
+    print(json.dumps(result))
+
+
+def run_serve(args):
+    """Time /predict and /predict/batch in this process; print a JSON line"""
+    env = artifact_env(args.dataset, args.workdir, args.backend)
+    # Every request runs the model: no cache, coalescing or precomputed index.
+    # EPOCHS=0 so a missing model is never trained in the background.
+    os.environ.update(env, PREDICTION_CACHE_MB="0", SINGLE_FLIGHT="0", EPOCHS="0")
+    import server
+    import corpus
+
+    if not server.wait_until_ready():
+        raise RuntimeError(server._startup["error"])
+    rng = np.random.default_rng(args.seed)
+    prompts = corpus.sample_prompts(server.read_dataset(args.dataset), args.requests, rng)
+    client = server.app.test_client()
+
+    def predict(prompt):
+        response = client.post("/predict", json={"text": prompt, "num_words": args.num_words})
+        if response.status_code != 200:
+            raise RuntimeError(response.get_json())
+
+    for prompt in prompts[:20]:
+        predict(prompt)
+    times = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        predict(prompt)
+        times.append((time.perf_counter() - start) * 1000)
+    p50, p90, p99 = np.percentile(times, [50, 90, 99])
+
+    batch = corpus.sample_prompts(server.read_dataset(args.dataset), args.batch_size, rng)
+    body = {"prompts": batch, "num_words": args.num_words}
+    client.post("/predict/batch", json=body)
+    words = 0
+    start = time.perf_counter()
+    for _ in range(args.batch_rounds):
+        response = client.post("/predict/batch", json=body)
+        if response.status_code != 200:
+            raise RuntimeError(response.get_json())
+        words += sum(len(r.get("words", ())) for r in response.get_json()["results"])
+    elapsed = time.perf_counter() - start
+
+    print(
+        json.dumps(
+            {
+                "backend": args.backend,
+                "latency_ms": {
+                    "requests": len(times),
+                    "num_words": args.num_words,
+                    "mean": round(float(np.mean(times)), 3),
+                    "p50": round(float(p50), 3),
+                    "p90": round(float(p90), 3),
+                    "p99": round(float(p99), 3),
+                },
+                "throughput": {
+                    "batch_size": len(batch),
+                    "rounds": args.batch_rounds,
+                    "prompts_per_s": round(len(batch) * args.batch_rounds / elapsed, 1),
+                    "words_per_s": round(words / elapsed, 1),
+                },
+                "peak_rss_kb": corpus.peak_rss_kb(),
+            }
+        )
+    )
+
+
+def run_worker(kind, args, dataset, workdir):
+    command = [sys.executable, __file__, "--worker", kind, "--dataset", dataset, "--workdir", workdir]
+    for flag in ("epochs", "requests", "num_words", "batch_size", "batch_rounds", "backend", "seed"):
+        command += [f"--{flag.replace('_', '-')}", str(getattr(args, flag))]
+    result = subprocess.run(command, capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(f"{kind} worker failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_revision():
+    try:
+        head = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=ROOT, check=True)
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, cwd=ROOT
+        )
+        return {"commit": head.stdout.strip(), "dirty": bool(status.stdout.strip())}
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    def version(package):
+        try:
+            return importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            return None
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "tensorflow": version("tensorflow"),
+        "flask": version("flask"),
+        "git": git_revision(),
+        "env": {k: v for k, v in os.environ.items() if k in ("SEQ_LEN", "MAX_VOCAB", "EMBED_DIM", "LSTM_UNITS",
+                                                             "BATCH_SIZE", "WORKER_THREADS", "OMP_NUM_THREADS")},
+    }
+
+
+def run_suite(args):
+    results = {
+        "schema": SCHEMA,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "settings": {
+            "epochs": args.epochs,
+            "requests": args.requests,
+            "num_words": args.num_words,
+            "batch_size": args.batch_size,
+            "batch_rounds": args.batch_rounds,
+            "backend": args.backend,
+            "seed": args.seed,
+        },
+        "datasets": {},
+    }
+    print(f"{'Dataset':<24}{'Tokens':>9}{'Encode ms':>11}{'Epoch s':>9}{'p50 ms':>8}{'p99 ms':>8}{'Batch/s':>9}")
+    for dataset in args.datasets:
+        if not os.path.exists(ROOT / dataset):
+            print(f"⚠️  {dataset} not found, skipped")
+            continue
+        with tempfile.TemporaryDirectory() as workdir:
+            prepare = run_worker("prepare", args, dataset, workdir)
+            serve = run_worker("serve", args, dataset, workdir)
+        results["config"] = prepare.pop("config")
+        results["environment"]["tensorflow"] = prepare.pop("tensorflow")
+        entry = {**prepare, **serve}
+        entry["peak_rss_mb"] = {
+            "prepare": round(prepare["peak_rss_kb"] / 1024, 1) if prepare["peak_rss_kb"] else None,
+            "serve": round(serve["peak_rss_kb"] / 1024, 1) if serve["peak_rss_kb"] else None,
+        }
+        del entry["peak_rss_kb"]
+        results["datasets"][dataset] = entry
+        epoch = entry["training"]["mean_epoch_s"]
+        print(
+            f"{dataset:<24}{entry['tokens']:>9,}{entry['tokenize']['encode_ms']:>11.1f}"
+            f"{epoch if epoch is not None else float('nan'):>9.2f}{entry['latency_ms']['p50']:>8.2f}"
+            f"{entry['latency_ms']['p99']:>8.2f}{entry['throughput']['prompts_per_s']:>9.0f}"
+        )
+    return results
+
+
+def lookup(entry, path):
+    for key in path:
+        if not isinstance(entry, dict) or entry.get(key) is None:
+            return None
+        entry = entry[key]
+    return entry
+
+
+def compare(baseline, current, threshold):
+    """Print each compared metric with its change; return the regressions."""
+    regressions = []
+    print(f"{'Dataset':<24}{'Metric':<24}{'Baseline':>11}{'Current':>11}{'Change':>9}")
+    for dataset, entry in current["datasets"].items():
+        base = baseline["datasets"].get(dataset)
+        if base is None:
+            print(f"{dataset:<24}(not in baseline)")
+            continue
+        for path, label, better, floor in COMPARED:
+            old, new = lookup(base, path), lookup(entry, path)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            worse = new - old if better == "lower" else old - new
+            regressed = worse > floor and worse / old > threshold if old else False
+            mark = "❌" if regressed else "✅"
+            print(f"{dataset:<24}{label:<24}{old:>11.3f}{new:>11.3f}{change:>+8.1%} {mark}")
+            if regressed:
+                regressions.append((dataset, label, old, new))
+    return regressions
+
+
+def main():
+    args = parse_args()
+    if args.worker == "prepare":
+        run_prepare(args)
+        return True
+    if args.worker == "serve":
+        run_serve(args)
+        return True
+
+    print("=" * 72)
+    print("🏁 BENCHMARK SUITE")
+    print("=" * 72)
+    if args.current:
+        with open(args.current) as f:
+            results = json.load(f)
+    else:
+        results = run_suite(args)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+    if not args.compare:
+        return True
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    print(f"\n📊 Compared with {args.compare} (regression: > {args.threshold:.0%} worse)")
+    if baseline.get("environment", {}).get("platform") != results.get("environment", {}).get("platform"):
+        print("⚠️  Baseline was measured on a different platform")
+    regressions = compare(baseline, results, args.threshold)
+    print("=" * 72)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s)")
+        return False
+    print("🎉 No regressions")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Build the continuation index: top-k candidates for frequent contexts
+Counts the padded SEQ_LEN-token contexts of the tokenized dataset, scores the
+most frequent ones with the loaded model in large batches and writes their
+top-k continuations to CONTINUATION_INDEX_FILE, which server.py answers from
+without running the model. Reports corpus coverage and the hit rate of
+prompts sampled from the dataset.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["ENABLE_BATCHING"] = "0"
+
+import server  # noqa: E402
+from continuation_index import ContinuationIndex, frequent_contexts, write_index  # noqa: E402
+from corpus import sample_prompts  # noqa: E402
+from prediction_cache import top_k  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dataset", default=server.DATASET_FILE)
+    parser.add_argument("--output", default=server.CONTINUATION_INDEX_FILE)
+    parser.add_argument("--max-contexts", type=int, default=50000, help="most frequent contexts to keep")
+    parser.add_argument("--min-count", type=int, default=2, help="ignore contexts seen fewer times")
+    parser.add_argument("--top-k", type=int, default=server.CANDIDATES_K, help="candidates stored per context")
+    parser.add_argument("--batch-size", type=int, default=4096, help="contexts scored per model call")
+    parser.add_argument("--sample-prompts", type=int, default=2000, help="dataset prompts used for the hit rate")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("=" * 60)
+    print("🗂️  CONTINUATION INDEX BUILD")
+    print("=" * 60)
+    if args.top_k < server.CANDIDATES_K:
+        print(f"❌ --top-k must be at least CANDIDATES_K ({server.CANDIDATES_K}) for the server to use the index")
+        return False
+    if not server.wait_until_ready():
+        print(f"❌ Model failed to load: {server._startup['error']}")
+        return False
+
+    started = time.perf_counter()
+    ids = server.dataset_token_ids(server._vocab, args.dataset)
+    contexts, counts, windows = frequent_contexts(ids, server.SEQ_LEN, args.max_contexts, args.min_count)
+    count_s = time.perf_counter() - started
+    print(f"Dataset: {args.dataset} ({len(ids):,} tokens, {windows:,} windows)")
+    print(f"Contexts kept: {len(contexts):,} (seen >= {args.min_count}x) in {count_s:.2f} s")
+
+    started = time.perf_counter()
+    top_ids = np.zeros((len(contexts), args.top_k), dtype=np.int32)
+    top_probs = np.zeros((len(contexts), args.top_k), dtype=np.float32)
+    for start in range(0, len(contexts), args.batch_size):
+        batch = contexts[start : start + args.batch_size]
+        preds = server._model.predict(batch, batch_size=len(batch), verbose=0)
+        for i, row in enumerate(preds):
+            # Same selection as the prediction cache, so indexed and
+            # model-scored contexts decode identically.
+            row_ids, row_probs = top_k(row, args.top_k)
+            top_ids[start + i, : len(row_ids)] = row_ids
+            top_probs[start + i, : len(row_probs)] = row_probs
+    score_s = time.perf_counter() - started
+    rate = len(contexts) / score_s if score_s else 0.0
+    print(f"Scored in {score_s:.2f} s ({rate:,.0f} contexts/s, batch {args.batch_size})")
+
+    # Full windows never start with the padding id; short padded n-grams do.
+    full = contexts[:, 0] != 0 if len(contexts) else np.zeros(0, dtype=bool)
+    coverage = float(counts[full].sum() / windows) if windows else 0.0
+    meta = {"source": server.model_source(), "dataset": args.dataset, "coverage": round(coverage, 4)}
+    write_index(args.output, contexts, top_ids, top_probs, meta)
+    print(f"Index: {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB, top-{args.top_k})")
+    print(f"Built for: {meta['source']}")
+    print(f"Corpus coverage: {coverage:.1%} of {server.SEQ_LEN}-token windows")
+
+    index = ContinuationIndex.load(args.output)
+    text = server.read_dataset(args.dataset)
+    prompts = sample_prompts(text, args.sample_prompts, np.random.default_rng(0))
+    for tokens in server._vocab.texts_to_sequences(prompts):
+        index.get(server.pad_context(tokens))
+    stats = index.stats()
+    print(f"Sampled prompt hit rate: {stats['hit_rate']:.1%} ({stats['hits']:,}/{len(prompts):,})")
+    del index
+    print("=" * 60)
+    print("🎉 Restart the server to serve from the index (see continuation_index in /stats)")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
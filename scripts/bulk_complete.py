@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Offline bulk completion without the Flask server
+Streams prompts (one per line, or JSONL strings or objects with "text" and
+the other /predict/batch item keys) from a file, decodes them in chunks
+across a process pool - each chunk as one batch, one forward pass per step -
+and appends one JSON result per prompt to the output in input order.
+Re-running with --resume continues after the last complete output line.
+"""
+
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="prompt file (one prompt per line, or .jsonl); - for stdin")
+    parser.add_argument("output", help="JSONL results, one line per input prompt")
+    parser.add_argument("--format", choices=("auto", "text", "jsonl"), default="auto")
+    parser.add_argument("--num-words", type=int, default=3, help="default words per prompt")
+    parser.add_argument("--decode-mode", default=None, help="default decode mode (server DECODE_MODE)")
+    parser.add_argument("--skip-special", action="store_true", help="never stop at <OOV>/padding ids")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=256, help="prompts decoded together per task")
+    parser.add_argument("--resume", action="store_true", help="skip prompts already in the output")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="seconds between progress lines")
+    return parser.parse_args()
+
+
+ARGS = parse_args() if __name__ == "__main__" else None
+if ARGS is not None:
+    # Before importing server: no scheduler thread, and with several workers
+    # the memory-mapped flat weights that forked processes share.
+    os.environ["ENABLE_BATCHING"] = "0"
+    os.environ.setdefault("INFERENCE_BACKEND", "numpy")
+    os.environ["WORKERS"] = str(max(1, ARGS.workers))
+
+import server  # noqa: E402
+
+
+def read_prompts(path, fmt, skip):
+    """Yield (line_no, item) for every input line after the first `skip`
+
+    A JSONL line that does not parse yields a ValueError as its item, which
+    server.predict_batch_items reports as that line's error.
+    """
+    if fmt == "auto":
+        fmt = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "text"
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8", errors="ignore")
+    try:
+        for line_no, line in enumerate(f):
+            if line_no < skip:
+                continue
+            line = line.rstrip("\n")
+            if fmt == "text":
+                yield line_no, {"text": line}
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                item = ValueError("invalid JSON")
+            yield line_no, item
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def complete_chunk(chunk, defaults):
+    """Decode one chunk of (line_no, item) in this process; results in order"""
+    results = server.predict_batch_items([item for _, item in chunk], defaults)
+    lines = []
+    for (line_no, item), result in zip(chunk, results):
+        text = item.get("text") if isinstance(item, dict) else item
+        line = {"line": line_no, "text": text} if isinstance(text, str) else {"line": line_no}
+        line.update(result)
+        lines.append(line)
+    return lines
+
+
+def chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def completed_lines(path):
+    """Number of complete lines in `path`, truncating a partly written last line"""
+    if not os.path.exists(path):
+        return 0
+    count = 0
+    good_end = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            count += 1
+            good_end += len(line)
+    if good_end != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good_end)
+    return count
+
+
+def main():
+    args = ARGS
+    print("=" * 60)
+    print("📝 BULK COMPLETION")
+    print("=" * 60)
+    if args.workers > 1 and server.INFERENCE_BACKEND != "numpy":
+        print("❌ --workers > 1 requires INFERENCE_BACKEND=numpy (TensorFlow is not fork-safe)")
+        return False
+    if os.path.exists(args.output) and not args.resume:
+        print(f"❌ {args.output} exists; pass --resume to continue it or remove it")
+        return False
+    if not server.wait_until_ready():
+        print(f"❌ Model failed to load: {server._startup['error']}")
+        return False
+
+    skip = completed_lines(args.output) if args.resume else 0
+    if skip:
+        print(f"↪️  Resuming after {skip:,} completed prompts")
+    defaults = {"num_words": args.num_words}
+    if args.decode_mode:
+        defaults["decode_mode"] = args.decode_mode
+    if args.skip_special:
+        defaults["skip_special"] = True
+    print(f"Backend: {server.INFERENCE_BACKEND}, workers: {args.workers}, chunk size: {args.chunk_size}")
+
+    import multiprocessing
+
+    # Workers fork after the model is loaded, so they start ready and share
+    # the read-only weight pages (and the batch tokenizer built here).
+    server.fast_tokenizer(server._vocab)
+    pool = multiprocessing.get_context("fork").Pool(args.workers) if args.workers > 1 else None
+    pending = collections.deque()
+    max_pending = 2 * args.workers
+    prompts = words = 0
+    started = last_report = time.perf_counter()
+
+    def write(results):
+        nonlocal prompts, words
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+            words += len(result.get("words", ()))
+        prompts += len(results)
+        out.flush()
+
+    def report(final=False):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"{'✅ Done' if final else '⏳'} {prompts:,} prompts in {elapsed:.1f} s - "
+              f"{prompts / elapsed:,.1f} prompts/s, {words / elapsed:,.1f} tokens/s", flush=True)
+
+    try:
+        with open(args.output, "a", encoding="utf-8") as out:
+            for chunk in chunks(read_prompts(args.input, args.format, skip), args.chunk_size):
+                if pool is None:
+                    write(complete_chunk(chunk, defaults))
+                else:
+                    # Bounded in-flight window: input is read only as fast as
+                    # results are written, and output stays in input order.
+                    pending.append(pool.apply_async(complete_chunk, (chunk, defaults)))
+                    while len(pending) >= max_pending or (pending and pending[0].ready()):
+                        write(pending.popleft().get())
+                if time.perf_counter() - last_report >= args.progress_every:
+                    report()
+                    last_report = time.perf_counter()
+            while pending:
+                write(pending.popleft().get())
+    finally:
+        if pool is not None:
+            pool.terminate()
+    report(final=True)
+    print(f"Results: {args.output} ({skip + prompts:,} lines)")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Parity check: NumPy inference engine vs. the Keras model in model.h5
+Exports the model to a temporary .npz, then compares tokenization and
+next-word probabilities on corpus windows and random batches
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["INFERENCE_BACKEND"] = "keras"
+os.environ["ENABLE_BATCHING"] = "0"
+
+import server  # noqa: E402
+from numpy_lstm import PARITY_ATOL, NumpyLSTM, export_keras_model  # noqa: E402
+
+
+def check_tokenizer(name, keras_tokenizer, tokenizer, text):
+    """`tokenizer` must give the same ids as the Keras tokenizer"""
+    lines = [line for line in text.splitlines() if line.strip()] + [text]
+    expected = keras_tokenizer.texts_to_sequences(lines)
+    actual = tokenizer.texts_to_sequences(lines)
+    if expected == actual:
+        print(f"✅ {name} parity: PASSED ({len(lines)} texts)")
+        return True
+    print(f"❌ {name} parity: FAILED")
+    return False
+
+
+def check_predictions(engine, name, x):
+    """Engine probabilities must match model.predict within PARITY_ATOL"""
+    expected = server._model.predict(x, batch_size=256, verbose=0)
+    actual = engine.predict(x)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    argmax_agree = float(np.mean(expected.argmax(-1) == actual.argmax(-1)))
+    ok = max_diff <= PARITY_ATOL
+    status = "PASSED" if ok else "FAILED"
+    print(f"{'✅' if ok else '❌'} {name}: {status} "
+          f"(batch={len(x)}, max |diff|={max_diff:.2e}, argmax agreement={argmax_agree:.2%})")
+    return ok
+
+
+def main():
+    print("=" * 60)
+    print("🧪 NUMPY ENGINE PARITY CHECK")
+    print("=" * 60)
+    print(f"Tolerance: max absolute difference <= {PARITY_ATOL:g} on probabilities")
+    if not server.wait_until_ready():
+        print(f"❌ Model failed to load: {server._startup['error']}")
+        return False
+
+    # The server skips the pickle when its vocabulary file is current.
+    keras_tokenizer = server._tokenizer or server.build_or_load_tokenizer(server.DATASET_FILE)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "engine.npz")
+        export_keras_model(server._model, keras_tokenizer, path)
+        engine = NumpyLSTM.load(path)
+
+    text = server.read_dataset(server.DATASET_FILE)
+    x, _ = server.make_sequences(keras_tokenizer, text)
+    rng = np.random.default_rng(0)
+    vocab_size = engine.input_table.shape[0]
+
+    results = [
+        check_tokenizer("Engine tokenizer", keras_tokenizer, engine.tokenizer, text),
+        check_tokenizer("Vocabulary file", keras_tokenizer, server._vocab, text),
+    ]
+    if x is not None:
+        sample = x[rng.choice(len(x), size=min(len(x), 512), replace=False)]
+        results.append(check_predictions(engine, "Corpus windows", sample))
+    random_x = rng.integers(0, vocab_size, size=(256, server.SEQ_LEN), dtype=np.int32)
+    results.append(check_predictions(engine, "Random windows", random_x))
+    results.append(check_predictions(engine, "Single window", random_x[:1]))
+
+    print("=" * 60)
+    if all(results):
+        print("🎉 NumPy engine matches model.h5")
+        return True
+    print("❌ NumPy engine does not match model.h5")
+    return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
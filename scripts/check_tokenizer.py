@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Parity and speed check: FastTokenizer vs. Keras Tokenizer.texts_to_sequences
+Fits Keras tokenizers on every file in data/ (several num_words / OOV
+settings), requires identical ids line by line and for the whole file, and
+times corpus and prompt tokenization
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+from tensorflow.keras.preprocessing.text import Tokenizer  # noqa: E402
+
+from fast_tokenizer import FastTokenizer  # noqa: E402
+from vocab import Vocab, write_vocab_from_tokenizer  # noqa: E402
+
+SETTINGS = [(5000, "<OOV>"), (None, None), (100, None), (50, "<OOV>")]
+EDGE_TEXTS = ["", "   ", "!!!", "The  QUICK\tbrown\nfox", "naïve café ÜBER", "don't stop-me now", "a" * 50]
+PROMPTS = ["the", "machine learning is", "the quick brown fox jumps over"]
+
+
+def best_ms(fn, repeats=5):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def check_file(path, tmp):
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    texts = [line for line in text.splitlines() if line.strip()] + EDGE_TEXTS + [text]
+    ok = True
+    for num_words, oov_token in SETTINGS:
+        keras_tokenizer = Tokenizer(num_words=num_words, oov_token=oov_token)
+        keras_tokenizer.fit_on_texts([text])
+        fast = FastTokenizer.from_tokenizer(keras_tokenizer)
+        vocab_path = os.path.join(tmp, f"vocab_{num_words}_{oov_token}.bin")
+        write_vocab_from_tokenizer(vocab_path, keras_tokenizer)
+        vocab = Vocab.load(vocab_path)
+
+        expected = keras_tokenizer.texts_to_sequences(texts)
+        same = (
+            fast.texts_to_sequences(texts) == expected
+            and [ids.tolist() for ids in fast.texts_to_ids(texts)] == expected
+            and fast.text_to_ids(text).tolist() == expected[-1]
+            and vocab.texts_to_sequences(texts) == expected
+        )
+        ok = ok and same
+        print(f"   {'✅' if same else '❌'} num_words={num_words}, oov_token={oov_token}: "
+              f"{len(texts)} texts, {len(expected[-1]):,} tokens")
+        if (num_words, oov_token) == SETTINGS[0]:
+            timed = (keras_tokenizer, fast, vocab)
+        else:
+            del vocab
+
+    keras_tokenizer, fast, vocab = timed
+    keras_ms = best_ms(lambda: np.asarray(keras_tokenizer.texts_to_sequences([text])[0], dtype=np.int32))
+    fast_ms = best_ms(lambda: fast.text_to_ids(text))
+    print(f"   ⏱️  whole file: Keras {keras_ms:.1f} ms, FastTokenizer {fast_ms:.1f} ms ({keras_ms / fast_ms:.1f}x)")
+    return ok, keras_tokenizer, fast, vocab
+
+
+def main():
+    print("=" * 60)
+    print("🔤 FAST TOKENIZER PARITY CHECK")
+    print("=" * 60)
+    files = sorted((ROOT / "data").glob("*.txt"))
+    if not files:
+        print("❌ No files in data/")
+        return False
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in files:
+            print(f"📄 {path.name}")
+            ok, keras_tokenizer, fast, vocab = check_file(path, tmp)
+            results.append(ok)
+
+        print(f"\nPrompt tokenization (per prompt, {files[-1].name})")
+        n = 2000
+        for name, tok in [("Keras", keras_tokenizer), ("FastTokenizer", fast), ("Vocab (mmap)", vocab)]:
+            elapsed = best_ms(lambda: [tok.texts_to_sequences([p]) for _ in range(n) for p in PROMPTS], 3)
+            print(f"   {name:<24}  {elapsed * 1000 / (n * len(PROMPTS)):8.2f} µs")
+        del vocab
+
+    print("=" * 60)
+    if all(results):
+        print(f"🎉 Identical ids on all {len(files)} files")
+        return True
+    print("❌ FastTokenizer output differs from Keras")
+    return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Export the trained Keras model and tokenizer as the artifact bundle
+Writes ENGINE_FILE (default: model_weights.npz): weights, vocabulary and model
+config, so the server can run with INFERENCE_BACKEND=numpy, never read the
+corpus and never import TensorFlow
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["INFERENCE_BACKEND"] = "keras"
+os.environ["ENABLE_BATCHING"] = "0"
+
+import server  # noqa: E402  (loads or trains model.h5 / tokenizer.pkl)
+from numpy_lstm import export_keras_model  # noqa: E402
+
+
+def main():
+    print("=" * 60)
+    print("📦 EXPORTING THE ARTIFACT BUNDLE")
+    print("=" * 60)
+    if not server.wait_until_ready():
+        print(f"❌ Model failed to load: {server._startup['error']}")
+        return False
+    tokenizer = server._tokenizer or server.build_or_load_tokenizer(server.DATASET_FILE)
+    export_keras_model(server._model, tokenizer, server.ENGINE_FILE)
+    size_kb = os.path.getsize(server.ENGINE_FILE) / 1024
+    print(f"✅ Wrote {server.ENGINE_FILE} ({size_kb:.1f} KB)")
+    print("   Serve it with: INFERENCE_BACKEND=numpy python server.py")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -1,23 +1,86 @@
+#!/usr/bin/env python3
+"""
+Charts of a benchmark run (scripts/benchmark.py) across datasets
+Reads the results JSON and plots tokenization, training, latency, batch
+throughput and peak memory per dataset. With --baseline, the baseline is
+drawn next to each bar.
+"""
+
+import argparse
+import json
+import os
+import sys
+
 import matplotlib.pyplot as plt
 import numpy as np
 
-# Data
-datasets = [500, 1000, 8000, 10000]
-cpu_times = [0.68, 0.94, 7.18, 58.03]
-openmp_times = [0.035, 0.076, 0.09, 0.104]
-gpu_times = [0.00012, 0.00014, 0.00016, 0.00025]
-
-x = np.arange(len(datasets))
-width = 0.25
-
-plt.figure(figsize=(10,6))
-plt.bar(x - width, cpu_times, width, label='CPU')
-plt.bar(x, openmp_times, width, label='OpenMP')
-plt.bar(x + width, gpu_times, width, label='GPU')
-plt.xlabel('Dataset Size')
-plt.ylabel('Time (seconds)')
-plt.title('Performance Comparison: CPU vs OpenMP vs GPU')
-plt.xticks(x, datasets)
-plt.legend()
-plt.tight_layout()
-plt.show()
+# (title, y label, [(path in a dataset's results, legend label)])
+PANELS = [
+    ("Tokenization", "ms", [(("tokenize", "fit_ms"), "fit"), (("tokenize", "encode_ms"), "encode")]),
+    ("Training", "s per epoch", [(("training", "mean_epoch_s"), "epoch")]),
+    ("Window construction", "ms", [(("windows", "copy_ms"), "copy"), (("windows", "view_ms"), "view")]),
+    ("/predict latency", "ms", [(("latency_ms", "p50"), "p50"), (("latency_ms", "p99"), "p99")]),
+    ("/predict/batch throughput", "prompts/s", [(("throughput", "prompts_per_s"), "prompts/s")]),
+    ("Peak memory", "MB RSS", [(("peak_rss_mb", "prepare"), "prepare"), (("peak_rss_mb", "serve"), "serve")]),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("results", nargs="?", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="results JSON drawn as hatched bars for comparison")
+    parser.add_argument("--output", help="save the figure here instead of showing it")
+    return parser.parse_args()
+
+
+def value(entry, path):
+    for key in path:
+        entry = entry.get(key) if isinstance(entry, dict) else None
+    return np.nan if entry is None else entry
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.results):
+        print(f"❌ {args.results} not found - run scripts/benchmark.py first")
+        return False
+    with open(args.results) as f:
+        results = json.load(f)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    datasets = list(results["datasets"])
+    labels = [f"{os.path.basename(d)}\n{results['datasets'][d]['tokens']:,} tokens" for d in datasets]
+    x = np.arange(len(datasets))
+    fig, axes = plt.subplots(2, 3, figsize=(16, 9))
+    for ax, (title, unit, series) in zip(axes.flat, PANELS):
+        runs = [(results, "", None)] + ([(baseline, " (baseline)", "//")] if baseline else [])
+        bars = [(run, path, name + suffix, hatch) for path, name in series for run, suffix, hatch in runs]
+        width = 0.8 / len(bars)
+        for i, (run, path, name, hatch) in enumerate(bars):
+            heights = [value(run["datasets"].get(d, {}), path) for d in datasets]
+            ax.bar(x + (i - (len(bars) - 1) / 2) * width, heights, width, label=name, hatch=hatch)
+        ax.set_title(title)
+        ax.set_ylabel(unit)
+        ax.set_xticks(x, labels, fontsize=8)
+        ax.legend(fontsize=8)
+
+    env = results["environment"]
+    commit = (env.get("git") or {}).get("commit", "")[:10]
+    fig.suptitle(
+        f"Benchmark {results['created']} - {results['settings']['backend']} backend, "
+        f"Python {env['python']}, {env['cpu_count']} CPUs, {commit}"
+    )
+    fig.tight_layout()
+    if args.output:
+        fig.savefig(args.output, dpi=120)
+        print(f"📊 Saved {args.output}")
+    else:
+        plt.show()
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Streaming corpus ingestion: peak memory vs. corpus size
+Builds corpora of increasing size by repeating DATASET_FILE, then fits the
+tokenizer and writes token ids in a fresh process for each size, once with
+the streaming reader and once by reading the whole file (the old way)
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import corpus  # noqa: E402
+
+
+def run_worker(mode, path, out_path):
+    """Ingest `path` in this process and print a JSON result line"""
+    from tensorflow.keras.preprocessing.text import Tokenizer
+
+    baseline_kb = corpus.peak_rss_kb()
+    start = time.perf_counter()
+    if mode == "stream":
+        tokenizer = corpus.fit_tokenizer(path, 5000)
+        ids = corpus.write_token_ids(tokenizer, path, out_path)
+        num_tokens = len(ids)
+    else:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            text = f.read()
+        tokenizer = Tokenizer(num_words=5000, oov_token="<OOV>")
+        tokenizer.fit_on_texts([text])
+        num_tokens = len(tokenizer.texts_to_sequences([text])[0])
+    elapsed = time.perf_counter() - start
+    peak_kb = corpus.peak_rss_kb()
+    print(json.dumps({
+        "tokens": num_tokens,
+        "seconds": elapsed,
+        "peak_rss_kb": peak_kb,
+        "growth_kb": peak_kb - baseline_kb if peak_kb is not None else None,
+    }))
+
+
+def build_corpus(source, scale, path):
+    with open(source, "rb") as src:
+        data = src.read()
+    with open(path, "wb") as out:
+        for _ in range(scale):
+            out.write(data)
+            out.write(b"\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dataset", default=os.environ.get("DATASET_FILE", "data/dataset_10000.txt"))
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--worker", choices=["stream", "slurp"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.path, args.out)
+        return True
+
+    print("=" * 72)
+    print("📥 STREAMING CORPUS INGESTION - PEAK MEMORY VS. CORPUS SIZE")
+    print("=" * 72)
+    print(f"{'Corpus':>10}{'Tokens':>12}{'Mode':>9}{'Time (s)':>10}{'Peak RSS (MB)':>15}{'Growth (MB)':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            path = os.path.join(tmp, f"corpus_x{scale}.txt")
+            build_corpus(args.dataset, scale, path)
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            for mode in ("stream", "slurp"):
+                result = subprocess.run(
+                    [sys.executable, __file__, "--worker", mode, "--path", path,
+                     "--out", os.path.join(tmp, "ids.npy")],
+                    capture_output=True, text=True, check=True,
+                )
+                r = json.loads(result.stdout.strip().splitlines()[-1])
+                print(f"{size_mb:>8.1f}MB{r['tokens']:>12,}{mode:>9}{r['seconds']:>10.2f}"
+                      f"{r['peak_rss_kb'] / 1024:>15.1f}{r['growth_kb'] / 1024:>13.1f}")
+    print("\nGrowth = peak RSS during ingestion minus peak RSS after imports.")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Load generator and latency report for the HTTP API
+Drives /predict, /predict/batch and /predict/stream on a running server (or
+one it starts with --start-server) either closed-loop - --concurrency
+clients sending back to back - or open-loop at --rate requests/s with
+Poisson or constant arrivals. Prompts are drawn from a dataset, uniformly or
+with a Zipf skew. Reports throughput, error rates, latency and
+time-to-first-byte percentiles from HDR-style histograms, and writes
+everything to JSON with --output.
+"""
+
+import argparse
+import collections
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import corpus  # noqa: E402
+
+ENDPOINTS = ("predict", "batch", "stream")
+PERCENTILES = (50, 75, 90, 99, 99.9, 99.99, 100)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--mix", default="predict", help="endpoint weights, e.g. predict=8,stream=1,batch=1")
+    parser.add_argument("--concurrency", type=int, default=8, help="closed-loop clients (ignored with --rate)")
+    parser.add_argument("--rate", type=float, help="open-loop arrivals per second")
+    parser.add_argument("--arrival", choices=("poisson", "constant"), default="poisson")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="open-loop client threads")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of load before measuring")
+    parser.add_argument("--dataset", default="data/dataset_10000.txt", help="prompt source")
+    parser.add_argument("--unique-prompts", type=int, default=1000, help="distinct prompts drawn from the dataset")
+    parser.add_argument("--distribution", choices=("uniform", "zipf"), default="uniform")
+    parser.add_argument("--zipf-s", type=float, default=1.1, help="Zipf exponent (higher: fewer hot prompts)")
+    parser.add_argument("--num-words", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=16, help="prompts per /predict/batch request")
+    parser.add_argument("--timeout", type=float, default=30.0, help="client socket timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--start-server", action="store_true", help="run server.py on --url's port for the test")
+    return parser.parse_args()
+
+
+class HdrHistogram:
+    """Log-linear histogram of integer microseconds, in the spirit of HdrHistogram.
+
+    Each power of two is split into 2**SUB_BITS equal buckets, so every
+    recorded value is known to within 1/2**SUB_BITS (< 1%) however large,
+    and percentiles report the highest value of their bucket.
+    """
+
+    SUB_BITS = 7
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _bucket(self, value: int):
+        shift = max(0, value.bit_length() - 1 - self.SUB_BITS)
+        return (value >> shift) << shift, 1 << shift
+
+    def record(self, seconds: float):
+        value = max(1, int(seconds * 1e6))
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float):
+        """Value at percentile `p` (0-100) in microseconds"""
+        if not self.count:
+            return None
+        rank = max(1, int(np.ceil(p / 100 * self.count)))
+        seen = 0
+        for (lower, width), n in sorted(self.counts.items()):
+            seen += n
+            if seen >= rank:
+                return min(lower + width - 1, self.max)
+        return self.max
+
+    def summary_ms(self):
+        if not self.count:
+            return None
+        summary = {f"p{p:g}": round(self.percentile(p) / 1000, 3) for p in PERCENTILES}
+        summary.update(min=round(self.min / 1000, 3), mean=round(self.total / self.count / 1000, 3))
+        return summary
+
+    def buckets(self):
+        """[(bucket lower bound µs, count)] for the JSON report"""
+        return [[lower, n] for (lower, _), n in sorted(self.counts.items())]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = HdrHistogram()
+        self.service = HdrHistogram()
+        self.ttfb = HdrHistogram()
+        self.requests = 0
+        self.ok = 0
+        self.words = 0
+        # Streams that answered 200 and then sent an `error` event
+        self.stream_errors = 0
+        self.statuses = collections.Counter()
+        self.exceptions = collections.Counter()
+
+    def add(self, result, intended, sent, measuring):
+        if not measuring:
+            return
+        with self.lock:
+            self.requests += 1
+            if result["error"]:
+                self.exceptions[result["error"]] += 1
+                return
+            self.statuses[result["status"]] += 1
+            if result["stream_error"]:
+                self.stream_errors += 1
+            elif result["status"] == 200:
+                self.ok += 1
+                self.words += result["words"]
+            self.latency.record(result["end"] - intended)
+            self.service.record(result["end"] - sent)
+            if result["ttfb"] is not None:
+                self.ttfb.record(result["ttfb"] - sent)
+
+    def report(self, seconds):
+        errors = self.requests - self.ok
+        return {
+            "requests": self.requests,
+            "ok": self.ok,
+            "errors": errors,
+            "error_rate": round(errors / self.requests, 4) if self.requests else 0.0,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "stream_errors": self.stream_errors,
+            "exceptions": dict(self.exceptions),
+            "throughput_rps": round(self.ok / seconds, 2),
+            "words_per_s": round(self.words / seconds, 2),
+            "latency_ms": self.latency.summary_ms(),
+            "service_ms": self.service.summary_ms(),
+            "ttfb_ms": self.ttfb.summary_ms(),
+            "latency_histogram_us": self.latency.buckets(),
+        }
+
+
+class Client:
+    """One keep-alive HTTP connection per thread"""
+
+    def __init__(self, url, timeout):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def request(self, method, path, body=None):
+        """{"status", "ttfb", "end", "words", "stream_error", "error"}; times are perf_counter values"""
+        conn = self.connection()
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        try:
+            conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = conn.getresponse()
+            if path.startswith("/predict/stream") and response.status == 200:
+                return self._read_stream(response)
+            first = response.read(1)
+            ttfb = time.perf_counter() if first else None
+            data = first + response.read()
+            end = time.perf_counter()
+            words = 0
+            if response.status == 200:
+                payload = json.loads(data)
+                results = payload.get("results", [payload])
+                words = sum(len(r.get("words", ())) for r in results)
+            return {
+                "status": response.status,
+                "ttfb": ttfb,
+                "end": end,
+                "words": words,
+                "stream_error": False,
+                "error": None,
+            }
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            conn.close()
+            self.local.conn = None
+            return {
+                "status": None,
+                "ttfb": None,
+                "end": time.perf_counter(),
+                "words": 0,
+                "stream_error": False,
+                "error": type(e).__name__,
+            }
+
+    def _read_stream(self, response):
+        """SSE: time to the first event, count `word` events, stop at done/error"""
+        ttfb, words, stream_error = None, 0, False
+        event = None
+        for line in response:
+            if ttfb is None:
+                ttfb = time.perf_counter()
+            line = line.decode("utf-8").rstrip("\n")
+            if line.startswith("event: "):
+                event = line[7:]
+                words += event == "word"
+                stream_error |= event == "error"
+            elif not line and event in ("done", "error"):
+                break
+        response.read()
+        end = time.perf_counter()
+        return {"status": 200, "ttfb": ttfb, "end": end, "words": words, "stream_error": stream_error, "error": None}
+
+
+class Workload:
+    def __init__(self, args):
+        self.args = args
+        self.rng = np.random.default_rng(args.seed)
+        self.lock = threading.Lock()
+        self.prompts = self.load_prompts()
+        if args.distribution == "zipf":
+            weights = 1.0 / np.arange(1, len(self.prompts) + 1) ** args.zipf_s
+        else:
+            weights = np.ones(len(self.prompts))
+        self.prompt_p = weights / weights.sum()
+        mix = {}
+        for part in args.mix.split(","):
+            name, _, weight = part.partition("=")
+            if name not in ENDPOINTS:
+                raise SystemExit(f"unknown endpoint {name!r} in --mix (one of {', '.join(ENDPOINTS)})")
+            mix[name] = float(weight or 1)
+        self.endpoints = list(mix)
+        self.endpoint_p = np.array(list(mix.values())) / sum(mix.values())
+
+    def load_prompts(self):
+        """The first 1-8 words of random dataset lines, like a user would type"""
+        with open(ROOT / self.args.dataset, "r", encoding="utf-8", errors="ignore") as f:
+            return corpus.sample_prompts(f.read(), self.args.unique_prompts, self.rng)
+
+    def next_request(self):
+        """(endpoint, method, path, body)"""
+        with self.lock:
+            endpoint = self.endpoints[self.rng.choice(len(self.endpoints), p=self.endpoint_p)]
+            n = self.args.batch_size if endpoint == "batch" else 1
+            prompts = [self.prompts[i] for i in self.rng.choice(len(self.prompts), size=n, p=self.prompt_p)]
+        num_words = self.args.num_words
+        if endpoint == "predict":
+            return endpoint, "POST", "/predict", {"text": prompts[0], "num_words": num_words}
+        if endpoint == "batch":
+            return endpoint, "POST", "/predict/batch", {"prompts": prompts, "num_words": num_words}
+        query = urllib.parse.urlencode({"text": prompts[0], "num_words": num_words})
+        return endpoint, "GET", f"/predict/stream?{query}", None
+
+
+def run_load(args, workload, client):
+    """Run warm-up plus measured load; returns ({endpoint: EndpointStats}, seconds,
+    largest delay between a request's scheduled and actual send in seconds)"""
+    stats = {name: EndpointStats() for name in workload.endpoints}
+    send_delay = [0.0]
+    start = time.perf_counter()
+    measure_from = start + args.warmup
+    stop_at = measure_from + args.duration
+
+    def fire(intended):
+        endpoint, method, path, body = workload.next_request()
+        sent = time.perf_counter()
+        if intended >= measure_from:
+            send_delay[0] = max(send_delay[0], sent - intended)
+        result = client.request(method, path, body)
+        stats[endpoint].add(result, intended, sent, intended >= measure_from)
+
+    if args.rate:
+        # Open loop: arrivals follow the schedule whatever the server does, and
+        # latency is measured from the scheduled time, so a stalled server is
+        # not hidden by clients that wait before sending (coordinated omission).
+        rng = np.random.default_rng(args.seed + 1)
+        with ThreadPoolExecutor(max_workers=args.max_in_flight) as pool:
+            intended = start
+            while intended < stop_at:
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(fire, intended)
+                gap = rng.exponential(1 / args.rate) if args.arrival == "poisson" else 1 / args.rate
+                intended += gap
+    else:
+
+        def loop():
+            while True:
+                now = time.perf_counter()
+                if now >= stop_at:
+                    return
+                fire(now)
+
+        threads = [threading.Thread(target=loop, daemon=True) for _ in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return stats, time.perf_counter() - measure_from, send_delay[0]
+
+
+def wait_ready(client, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = client.request("GET", "/ready")
+        if result["status"] == 200:
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def server_stats(client):
+    conn = http.client.HTTPConnection(client.host, client.port, timeout=client.timeout)
+    try:
+        conn.request("GET", "/stats")
+        response = conn.getresponse()
+        return json.loads(response.read()) if response.status == 200 else None
+    except (OSError, http.client.HTTPException, ValueError):
+        return None
+    finally:
+        conn.close()
+
+
+def print_report(report):
+    print(f"\n{'Endpoint':<10}{'Requests':>10}{'OK':>9}{'Err %':>8}{'Req/s':>9}{'Words/s':>10}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'TTFB p50':>10}{'TTFB p99':>10}")
+    for name, e in report["endpoints"].items():
+        lat, ttfb = e["latency_ms"] or {}, e["ttfb_ms"] or {}
+        print(f"{name:<10}{e['requests']:>10,}{e['ok']:>9,}{e['error_rate']:>8.2%}{e['throughput_rps']:>9.1f}"
+              f"{e['words_per_s']:>10.1f}{lat.get('p50', 0):>9.2f}{lat.get('p99', 0):>9.2f}"
+              f"{lat.get('p100', 0):>9.2f}{ttfb.get('p50', 0):>10.2f}{ttfb.get('p99', 0):>10.2f}")
+    for name, e in report["endpoints"].items():
+        if e["latency_ms"]:
+            print(f"\n{name} latency distribution (ms):")
+            for p in PERCENTILES:
+                print(f"  {p:>7g}%  {e['latency_ms'][f'p{p:g}']:>10.3f}")
+        failures = {k: v for k, v in e["statuses"].items() if k != "200"}
+        failures.update(e["exceptions"])
+        if e["stream_errors"]:
+            failures["stream_error"] = e["stream_errors"]
+        if failures:
+            print(f"  errors: {failures}")
+
+
+def main():
+    args = parse_args()
+    print("=" * 72)
+    print("🚦 LOAD TEST")
+    print("=" * 72)
+    client = Client(args.url, args.timeout)
+    server = None
+    if args.start_server:
+        env = {**os.environ, "PORT": str(client.port)}
+        server = subprocess.Popen([sys.executable, "server.py"], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(client, 300 if server else 5):
+            print(f"❌ {args.url} is not ready - start the server or pass --start-server")
+            return False
+        workload = Workload(args)
+        mode = f"open loop, {args.rate:g} req/s {args.arrival}" if args.rate else f"closed loop, {args.concurrency} clients"
+        print(f"Target: {args.url} ({mode}, mix {args.mix})")
+        print(f"Prompts: {len(workload.prompts):,} from {args.dataset} ({args.distribution}), "
+              f"{args.num_words} words; warm-up {args.warmup:g} s, measuring {args.duration:g} s")
+
+        stats, seconds, send_delay = run_load(args, workload, client)
+        report = {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "target": args.url,
+            "settings": {k: v for k, v in vars(args).items() if k not in ("output", "start_server")},
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "measured_s": round(seconds, 3),
+            "max_send_delay_ms": round(send_delay * 1000, 3),
+            "endpoints": {name: s.report(seconds) for name, s in stats.items()},
+            "server_stats": server_stats(client),
+        }
+        print_report(report)
+        if args.rate and send_delay > 0.1:
+            print(f"\n⚠️  Requests were sent up to {send_delay * 1000:.0f} ms after their scheduled time: the client "
+                  "could not keep up with --rate (raise --max-in-flight or run it on another machine)")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\n💾 Report written to {args.output}")
+        print("=" * 72)
+        total = sum(e["requests"] for e in report["endpoints"].values())
+        ok = sum(e["ok"] for e in report["endpoints"].values())
+        print(f"{'🎉' if ok == total else '⚠️ '} {ok:,}/{total:,} requests succeeded in {seconds:.1f} s")
+        return True
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,74 @@
+"""
+Memory-mappable files of named arrays behind a JSON header.
+
+vocab.bin, the continuation index and the flat weights file share one
+layout: an 8-byte magic, the header length (u64, little-endian), the JSON
+header, then every array at a 64-byte aligned offset counted from the
+aligned end of the header. The header records each array's dtype, shape and
+offset under "sections", next to whatever the caller keeps there.
+`write_sections` writes to a temporary file and renames it over the old one,
+so a reader never maps a half-written file; `map_sections` maps the file
+read-only and returns views into the mapping without copying.
+"""
+
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+SECTION_ALIGN = 64
+
+
+def _align(n: int) -> int:
+    return (n + SECTION_ALIGN - 1) // SECTION_ALIGN * SECTION_ALIGN
+
+
+def write_sections(path: str, magic: bytes, header: Dict, arrays: Dict[str, np.ndarray]):
+    """Write `arrays` (in order) after `magic` and `header` plus their "sections"."""
+    specs, offset = {}, 0
+    for name, arr in arrays.items():
+        specs[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset = _align(offset + arr.nbytes)
+    encoded = json.dumps({**header, "sections": specs}).encode("utf-8")
+    data_start = _align(len(magic) + 8 + len(encoded))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(magic)
+        f.write(len(encoded).to_bytes(8, "little"))
+        f.write(encoded)
+        for name, arr in arrays.items():
+            f.seek(data_start + specs[name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_header(path: str, magic: bytes) -> Optional[Dict]:
+    """The JSON header, or None if the file does not start with `magic`."""
+    with open(path, "rb") as f:
+        if f.read(len(magic)) != magic:
+            return None
+        header_len = int.from_bytes(f.read(8), "little")
+        return json.loads(f.read(header_len))
+
+
+def map_sections(path: str, magic: bytes) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """(header, arrays) with the arrays as read-only views of a memory map.
+
+    Raises ValueError if the file does not start with `magic`.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f"{path} does not start with {magic!r}")
+        header_len = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_len))
+    data_start = _align(len(magic) + 8 + header_len)
+    mapped = np.memmap(path, dtype=np.uint8, mode="r")
+    arrays = {}
+    for name, spec in header["sections"].items():
+        dtype = np.dtype(spec["dtype"])
+        start = data_start + spec["offset"]
+        size = int(np.prod(spec["shape"])) * dtype.itemsize
+        arrays[name] = mapped[start : start + size].view(dtype).reshape(spec["shape"])
+    return header, arrays
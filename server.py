@@ -1,25 +1,65 @@
+from __future__ import annotations
+
 import os
+import collections
+import hmac
 import json
+import logging
 import pickle
-from typing import List
+import queue
+import signal
+import sys
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Iterator, List, Optional
+
+# Intra-op threads per process. BLAS reads these when NumPy is first imported,
+# so they have to be set before the imports below.
+WORKER_THREADS = int(os.environ.get("WORKER_THREADS", "0"))
+if WORKER_THREADS > 0:
+    for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(_var, str(WORKER_THREADS))
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, send_file
 from flask_cors import CORS
 
 import numpy as np
 
-# TensorFlow / Keras
+import corpus
+from admission import AdmissionControl, DeadlineExceeded, Rejected, expired
+from continuation_index import ContinuationIndex, read_index_header
+from fast_tokenizer import FastTokenizer
+from metrics import Metrics
+from numpy_lstm import NumpyLSTM, export_keras_model, keras_bundle_id, read_bundle_meta
+from prediction_cache import PredictionCache, top_k
+from profiling import ProfileRing, Sampler, hotspots
+from single_flight import SingleFlight
+from training import ModelGate, TrainingBusy, TrainingJob, TrainingJobs, progress_callback
+from vocab import Vocab, read_vocab_source, write_vocab_from_tokenizer
+
+# TensorFlow / Keras is imported lazily, only by the code paths that need it,
+# so INFERENCE_BACKEND=numpy can serve without loading TensorFlow at all.
 os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
-from tensorflow.keras.preprocessing.text import Tokenizer
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import Embedding, LSTM, Dense
+if TYPE_CHECKING:
+    from tensorflow.keras.preprocessing.text import Tokenizer
 
 
 # ---------------------- Config ----------------------
 DATASET_FILE = os.environ.get("DATASET_FILE", "data/dataset_10000.txt")
 MODEL_FILE = os.environ.get("MODEL_FILE", "model.h5")
 TOKENIZER_FILE = os.environ.get("TOKENIZER_FILE", "tokenizer.pkl")
+ENGINE_FILE = os.environ.get("ENGINE_FILE", "model_weights.npz")
+# Memory-mapped vocabulary used at serve time, rebuilt when the tokenizer changes
+VOCAB_FILE = os.environ.get("VOCAB_FILE", "vocab.bin")
+# Content-addressed cache of tokenized datasets (int32 .npy, memory-mapped),
+# keyed by the dataset bytes and the tokenizer; LRU-trimmed to TOKEN_CACHE_MB
+TOKEN_CACHE_DIR = os.environ.get("TOKEN_CACHE_DIR", ".token_cache")
+TOKEN_CACHE_MB = float(os.environ.get("TOKEN_CACHE_MB", "512"))
+
+# "keras" serves model.h5 through TensorFlow; "numpy" serves ENGINE_FILE
+# (written by scripts/export_numpy.py) without importing TensorFlow.
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "keras")
 
 MAX_VOCAB = int(os.environ.get("MAX_VOCAB", "5000"))
 SEQ_LEN = int(os.environ.get("SEQ_LEN", "5"))
@@ -28,128 +68,1776 @@ LSTM_UNITS = int(os.environ.get("LSTM_UNITS", "128"))
 EPOCHS = int(os.environ.get("EPOCHS", "3"))
 BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "64"))
 
+# "exact" re-scores the last SEQ_LEN tokens for every generated word, which is
+# what the model was trained on. "incremental" runs the prompt window once and
+# then carries the LSTM (h, c) state forward, feeding only the new token per
+# word; it is cheaper but lets the state see more than SEQ_LEN tokens, so its
+# output can differ from "exact". Requests can override it with "decode_mode".
+DECODE_MODE = os.environ.get("DECODE_MODE", "exact")
+DECODE_MODES = ("exact", "incremental")
+
+# Beam search (/predict "beam_width" > 1); widths are capped at CACHE_TOP_K
+# because each beam expands from the cached top-k candidates
+MAX_BEAM_WIDTH = int(os.environ.get("MAX_BEAM_WIDTH", "8"))
+
+# Pre-fork serving: WORKERS > 1 forks that many processes after loading the
+# weights once from FLAT_WEIGHTS_FILE (memory-mapped, shared by all workers).
+# Requires INFERENCE_BACKEND=numpy. PIN_WORKERS=1 pins each worker to its own
+# WORKER_THREADS CPUs.
+WORKERS = int(os.environ.get("WORKERS", "1"))
+FLAT_WEIGHTS_FILE = os.environ.get("FLAT_WEIGHTS_FILE", "model_weights.bin")
+PIN_WORKERS = os.environ.get("PIN_WORKERS", "0") == "1"
+
+# Micro-batching of concurrent /predict requests (set ENABLE_BATCHING=0 to
+# decode each request on its own, as before)
+ENABLE_BATCHING = os.environ.get("ENABLE_BATCHING", "1") == "1"
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "32"))
+BATCH_WINDOW_MS = float(os.environ.get("BATCH_WINDOW_MS", "5"))
+# Largest number of prompts accepted by one POST /predict/batch
+PREDICT_BATCH_MAX_ITEMS = int(os.environ.get("PREDICT_BATCH_MAX_ITEMS", "256"))
+# Keys a batch item may set, and the top-level defaults for them
+BATCH_ITEM_KEYS = ("num_words", "decode_mode", "top_k", "skip_special")
+
+# LRU cache of next-token distributions keyed by the padded context
+# (PREDICTION_CACHE_MB=0 disables it)
+PREDICTION_CACHE_MB = float(os.environ.get("PREDICTION_CACHE_MB", "16"))
+CACHE_TOP_K = int(os.environ.get("CACHE_TOP_K", "10"))
+# Candidates kept per context: two more than CACHE_TOP_K, so dropping the
+# padding and OOV ids ("skip_special") still leaves CACHE_TOP_K of them
+CANDIDATES_K = CACHE_TOP_K + 2
+
+# Identical /predict requests that are in flight at the same time share one
+# decode (SINGLE_FLIGHT=0 runs each on its own)
+SINGLE_FLIGHT = os.environ.get("SINGLE_FLIGHT", "1") == "1"
+
+# Admission control for /predict, /predict/stream and /predict/batch: requests
+# admitted at once per process (queued or decoding; more get 429), and the
+# longest a request may take (clients can ask for less with timeout_ms)
+MAX_QUEUE_DEPTH = int(os.environ.get("MAX_QUEUE_DEPTH", "64"))
+REQUEST_TIMEOUT_MS = float(os.environ.get("REQUEST_TIMEOUT_MS", "10000"))
+
+# Per-stage latency histograms and request/token counters, served at
+# /metrics (METRICS=0 turns the timing hooks into no-ops)
+METRICS = os.environ.get("METRICS", "1") == "1"
+
+# Profiling of single /predict requests ("X-Profile" header or "profile" query
+# parameter: "timings" or "cprofile"), allowed only when PROFILE_TOKEN is set
+# and sent as X-Profile-Token. PROFILE_SAMPLE_EVERY=N also captures every Nth
+# /predict. cProfile captures go to PROFILE_DIR, which keeps the newest
+# PROFILE_KEEP of them.
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_EVERY = int(os.environ.get("PROFILE_SAMPLE_EVERY", "0"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", ".profiles")
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "50"))
+PROFILE_MODES = ("timings", "cprofile")
+
+# Background training (POST /train, and on the first start without
+# MODEL_FILE). /train needs TRAIN_TOKEN, sent as X-Train-Token, and reads
+# datasets from TRAIN_DATA_DIR only; TRAIN_KEEP_JOBS jobs stay listed.
+TRAIN_TOKEN = os.environ.get("TRAIN_TOKEN", "")
+TRAIN_DATA_DIR = os.environ.get("TRAIN_DATA_DIR", "data")
+TRAIN_KEEP_JOBS = int(os.environ.get("TRAIN_KEEP_JOBS", "10"))
+# Largest value /train accepts for each hyperparameter
+TRAIN_LIMITS = {"epochs": 100, "batch_size": 4096, "max_vocab": 100000, "embed_dim": 1024, "lstm_units": 2048}
+
+# /complete: vocabulary words matching the typed prefix that are re-ranked by
+# the model (most frequent first), and the most completions returned
+COMPLETE_MAX_MATCHES = int(os.environ.get("COMPLETE_MAX_MATCHES", "2000"))
+COMPLETE_MAX_LIMIT = int(os.environ.get("COMPLETE_MAX_LIMIT", "10"))
+
+# Top-k candidates precomputed for the most frequent contexts
+# (scripts/build_continuation_index.py); answered without the model when the
+# file exists and was built for the loaded model
+CONTINUATION_INDEX_FILE = os.environ.get("CONTINUATION_INDEX_FILE", "continuation_index.bin")
+
+# Prompts run through every decoding path before /ready reports ready
+WARMUP_PROMPTS = [p for p in os.environ.get("WARMUP_PROMPTS", "the|the quick brown|machine learning is").split("|") if p]
+
 
 app = Flask(__name__)
 CORS(app)
+log = logging.getLogger("server")
+
+class _StreamStats:
+    """Time-to-first-word of /predict/stream over the last `window` requests."""
+
+    def __init__(self, window: int):
+        self._lock = threading.Lock()
+        self.ttfw_ms = collections.deque(maxlen=window)
+        self.streams = 0
+        self.cancelled = 0
+
+    def first_word(self, elapsed_ms: float):
+        with self._lock:
+            self.streams += 1
+            self.ttfw_ms.append(elapsed_ms)
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = np.array(self.ttfw_ms) if self.ttfw_ms else None
+            streams, cancelled = self.streams, self.cancelled
+        return {
+            "streams": streams,
+            "cancelled": cancelled,
+            "ttfw_p50_ms": round(float(np.percentile(samples, 50)), 2) if samples is not None else None,
+            "ttfw_p99_ms": round(float(np.percentile(samples, 99)), 2) if samples is not None else None,
+        }
+
+
+_stream_stats = _StreamStats(window=1000)
+_metrics = Metrics(enabled=METRICS)
+
+_cache = (
+    PredictionCache(int(PREDICTION_CACHE_MB * 1024 * 1024), CANDIDATES_K)
+    if PREDICTION_CACHE_MB > 0
+    else None
+)
+
+_single_flight = SingleFlight() if SINGLE_FLIGHT else None
+_profiles = ProfileRing(PROFILE_DIR, PROFILE_KEEP)
+_profile_sampler = Sampler(PROFILE_SAMPLE_EVERY)
+_training = TrainingJobs(TRAIN_KEEP_JOBS)
+_model_gate = ModelGate()
+_admission = AdmissionControl(MAX_QUEUE_DEPTH, REQUEST_TIMEOUT_MS, BATCH_MAX_SIZE if ENABLE_BATCHING else 1)
+
+
+def coalesced(key: tuple, fn, deadline: float = None):
+    """fn(), shared with identical requests already in flight.
+
+    Waiters give up at their own `deadline`. The key has to include the
+    request's time budget (timeout_ms): the leader stops at its own deadline,
+    so only requests asking for the same budget share it.
+    """
+    return _single_flight.do(key, fn, deadline) if _single_flight is not None else fn()
 
 
 def read_dataset(path: str) -> str:
     if not os.path.exists(path):
         # fallback sample text so app can start
-        return (
-            "the quick brown fox jumps over the lazy dog. "
-            "the quick brown cat sleeps on the warm mat. "
-            "the smart student studies hard and learns quickly. "
-        )
+        return corpus.FALLBACK_TEXT
     with open(path, "r", encoding="utf-8", errors="ignore") as f:
         return f.read()
 
 
-def build_or_load_tokenizer(text: str) -> Tokenizer:
+def build_or_load_tokenizer(dataset_path: str) -> Tokenizer:
     if os.path.exists(TOKENIZER_FILE):
         with open(TOKENIZER_FILE, "rb") as f:
             return pickle.load(f)
 
-    tokenizer = Tokenizer(num_words=MAX_VOCAB, oov_token="<OOV>")
-    tokenizer.fit_on_texts([text])
+    # Streams the corpus; same result as fit_on_texts([read_dataset(path)])
+    tokenizer = corpus.fit_tokenizer(dataset_path, MAX_VOCAB, oov_token="<OOV>")
     with open(TOKENIZER_FILE, "wb") as f:
         pickle.dump(tokenizer, f)
     return tokenizer
 
 
-def make_sequences(tokenizer: Tokenizer, text: str):
-    tokens = tokenizer.texts_to_sequences([text])[0]
-    # Build sliding windows of length SEQ_LEN -> next token target
-    inputs, targets = [], []
-    for i in range(SEQ_LEN, len(tokens)):
-        seq = tokens[i - SEQ_LEN : i]
-        target = tokens[i]
-        inputs.append(seq)
-        targets.append(target)
-    if not inputs:
+# FastTokenizer per tokenizer (Keras, engine or Vocab), built on first use;
+# it lives as long as its tokenizer, so a model swap starts a new one.
+_fast_tokenizers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def fast_tokenizer(tokenizer) -> FastTokenizer:
+    fast = _fast_tokenizers.get(tokenizer)
+    if fast is None:
+        fast = _fast_tokenizers[tokenizer] = FastTokenizer.from_tokenizer(tokenizer)
+    return fast
+
+
+def token_ids(tokenizer: Tokenizer, text: str) -> np.ndarray:
+    return fast_tokenizer(tokenizer).text_to_ids(text)
+
+
+def dataset_token_ids(tokenizer: Tokenizer, dataset_path: str) -> np.ndarray:
+    """Token ids of a dataset file, reused from the token cache when current."""
+    return corpus.cached_token_ids(tokenizer, dataset_path, TOKEN_CACHE_DIR, int(TOKEN_CACHE_MB * 1024 * 1024))
+
+
+def sliding_windows(ids: np.ndarray):
+    """(x, y) training pairs as read-only views over `ids`, without copying.
+
+    x[i] is ids[i : i + SEQ_LEN] and y[i] is ids[i + SEQ_LEN], so memory stays
+    at one int32 per token however many windows there are.
+    """
+    if len(ids) <= SEQ_LEN:
         return None, None
-    x = np.array(inputs)
-    y = np.array(targets)
+    x = np.lib.stride_tricks.sliding_window_view(ids[:-1], SEQ_LEN)
+    y = ids[SEQ_LEN:]
+    y.flags.writeable = False
     return x, y
 
 
-def build_or_load_model(vocab_size: int):
-    if os.path.exists(MODEL_FILE):
-        return load_model(MODEL_FILE)
+def make_sequences(tokenizer: Tokenizer, text: str):
+    return sliding_windows(token_ids(tokenizer, text))
+
+
+def make_dataset(ids: np.ndarray, batch_size: int, shuffle: bool = True):
+    """tf.data pipeline that gathers each batch of windows from `ids` on the fly."""
+    import tensorflow as tf
+
+    num_windows = len(ids) - SEQ_LEN
+    ids_t = tf.constant(ids, dtype=tf.int32)
+    offsets = tf.range(SEQ_LEN, dtype=tf.int64)
+
+    def gather(starts):
+        x = tf.gather(ids_t, starts[:, None] + offsets[None, :])
+        y = tf.gather(ids_t, starts + SEQ_LEN)
+        return x, y
+
+    starts = tf.data.Dataset.range(num_windows)
+    if shuffle:
+        starts = starts.shuffle(num_windows, reshuffle_each_iteration=True)
+    return starts.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+
+def build_model(vocab_size: int, embed_dim: int = EMBED_DIM, lstm_units: int = LSTM_UNITS):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Embedding, LSTM, Dense
 
     model = Sequential(
         [
-            Embedding(vocab_size, EMBED_DIM, input_length=SEQ_LEN),
-            LSTM(LSTM_UNITS),
+            Embedding(vocab_size, embed_dim, input_length=SEQ_LEN),
+            LSTM(lstm_units),
             Dense(vocab_size, activation="softmax"),
         ]
     )
+    # Keras 3 ignores input_length, so create the weights explicitly: an
+    # untrained model is exported to the NumPy engine before it is ever fit.
+    model.build((None, SEQ_LEN))
     model.compile(optimizer="adam", loss="sparse_categorical_crossentropy")
     return model
 
 
-def train_if_needed(model, tokenizer: Tokenizer, text: str):
+def build_or_load_model(vocab_size: int):
+    from tensorflow.keras.models import load_model
+
     if os.path.exists(MODEL_FILE):
-        return
-    x, y = make_sequences(tokenizer, text)
-    if x is None:
-        return
-    model.fit(x, y, epochs=EPOCHS, batch_size=BATCH_SIZE, verbose=1)
-    model.save(MODEL_FILE)
+        return load_model(MODEL_FILE)
+    return build_model(vocab_size)
+
+
+def pad_context(tokens: List[int]) -> List[int]:
+    # Same result as pad_sequences([tokens[-SEQ_LEN:]], maxlen=SEQ_LEN, padding="pre")
+    seq = tokens[-SEQ_LEN:]
+    return [0] * (SEQ_LEN - len(seq)) + list(seq)
+
 
+def next_token_candidates(model, vocab: Vocab, contexts: List[List[int]]):
+    """Top-k (ids, probs) for each padded context, best first.
 
-def greedy_predict(tokenizer: Tokenizer, model, prompt: str, num_words: int) -> List[str]:
-    word_index = tokenizer.word_index
-    index_word = {v: k for k, v in word_index.items()}
+    Contexts found in the continuation index or the prediction cache skip the
+    model; the rest are scored together in one forward pass (duplicates only
+    once).
+    """
+    keys = [tuple(c) for c in contexts]
+    results = {}
+    with _metrics.timer("cache_lookup"):
+        if _continuation_index is not None and model is _model:
+            for key in keys:
+                if key not in results:
+                    entry = _continuation_index.get(key)
+                    if entry is not None:
+                        results[key] = (entry[0][:CANDIDATES_K], entry[1][:CANDIDATES_K])
+        if _cache is not None:
+            _cache.bind(model, vocab)
+            for key in keys:
+                if key not in results:
+                    entry = _cache.get(key)
+                    if entry is not None:
+                        results[key] = entry
+    missing = [key for key in dict.fromkeys(keys) if key not in results]
+    if missing:
+        with _metrics.timer("model_predict"):
+            batch = np.array(missing, dtype=np.int32)
+            preds = model.predict(batch, batch_size=len(missing), verbose=0)
+        with _metrics.timer("top_k"):
+            for key, row in zip(missing, preds):
+                results[key] = _cache.put(key, row) if _cache is not None else top_k(row, CANDIDATES_K)
+    return [results[key] for key in keys]
 
-    result = []
-    tokens = tokenizer.texts_to_sequences([prompt])[0]
+
+def usable_candidates(vocab: Vocab, ids: np.ndarray, probs: np.ndarray, skip_special: bool):
+    """(ids, probs) without the padding and OOV ids when `skip_special` is set."""
+    if not skip_special:
+        return ids, probs
+    keep = ~np.isin(ids, vocab.special_ids)
+    return ids[keep], probs[keep]
+
+
+def iter_greedy(vocab: Vocab, model, prompt: str, num_words: int, skip_special: bool = False) -> Iterator[str]:
+    with _metrics.timer("tokenize"):
+        tokens = vocab.texts_to_sequences([prompt])[0]
     for _ in range(num_words):
-        seq = tokens[-SEQ_LEN:]
-        seq = pad_sequences([seq], maxlen=SEQ_LEN, padding="pre")
-        preds = model.predict(seq, verbose=0)[0]
-        next_id = int(np.argmax(preds))
-        next_word = index_word.get(next_id, None)
+        ids, probs = next_token_candidates(model, vocab, [pad_context(tokens)])[0]
+        with _metrics.timer("select"):
+            ids, _ = usable_candidates(vocab, ids, probs, skip_special)
+            next_id = int(ids[0])
+            next_word = vocab.word(next_id)
         if not next_word or next_word == "<OOV>":
             break
-        result.append(next_word)
+        yield next_word
         tokens.append(next_id)
-    return result
+
+
+def until_deadline(words: Iterator[str], num_words: int, deadline: float = None) -> Iterator[str]:
+    """`words`, raising DeadlineExceeded instead of starting a step after `deadline`."""
+    if deadline is None:
+        yield from words
+        return
+    try:
+        for i in range(num_words):
+            if expired(deadline):
+                raise DeadlineExceeded(f"deadline exceeded after {i} words")
+            word = next(words, None)
+            if word is None:
+                return
+            yield word
+    finally:
+        words.close()
+
+
+def greedy_predict(vocab: Vocab, model, prompt: str, num_words: int, skip_special: bool = False) -> List[str]:
+    return list(iter_greedy(vocab, model, prompt, num_words, skip_special))
+
+
+def iter_incremental(
+    vocab: Vocab, engine: NumpyLSTM, prompt: str, num_words: int, skip_special: bool = False
+) -> Iterator[str]:
+    with _metrics.timer("tokenize"):
+        tokens = vocab.texts_to_sequences([prompt])[0]
+    with _metrics.timer("lstm_step"):
+        h, c = engine.initial_state(np.array([pad_context(tokens)], dtype=np.int32))
+        probs = engine.output(h)[0]
+    for i in range(num_words):
+        with _metrics.timer("select"):
+            if skip_special:
+                probs[list(vocab.special_ids)] = -1.0
+            next_id = int(np.argmax(probs))
+            next_word = vocab.word(next_id)
+        if not next_word or next_word == "<OOV>":
+            break
+        yield next_word
+        if i + 1 < num_words:
+            with _metrics.timer("lstm_step"):
+                h, c = engine.step([next_id], h, c)
+                probs = engine.output(h)[0]
+
+
+def incremental_predict(
+    vocab: Vocab, engine: NumpyLSTM, prompt: str, num_words: int, skip_special: bool = False
+) -> List[str]:
+    return list(iter_incremental(vocab, engine, prompt, num_words, skip_special))
+
+
+def beam_search(
+    vocab: Vocab,
+    model,
+    prompt: str,
+    num_words: int,
+    beam_width: int,
+    skip_special: bool = False,
+    deadline: float = None,
+):
+    """Beam search returning up to `beam_width` (words, log-prob score), best first.
+
+    All live beams are scored in a single batched model call per step, and
+    both the per-beam expansion and the global pruning use np.argpartition
+    top-k selection rather than sorting the vocabulary. Expanding into an
+    unknown or padding id ends that hypothesis, as in greedy decoding, so
+    beam_width=1 gives the greedy result; with `skip_special` those ids are
+    never expanded. Raises DeadlineExceeded if `deadline` passes between steps.
+    """
+    tokens = vocab.texts_to_sequences([prompt])[0]
+    live = [(tokens, [], 0.0)]
+    finished = []
+    for _ in range(num_words):
+        if expired(deadline):
+            raise DeadlineExceeded("deadline exceeded during beam search")
+        candidates = next_token_candidates(model, vocab, [pad_context(t) for t, _, _ in live])
+        candidates = [usable_candidates(vocab, ids, probs, skip_special) for ids, probs in candidates]
+        beam_idx = np.concatenate([np.full(min(beam_width, len(ids)), b) for b, (ids, _) in enumerate(candidates)])
+        next_ids = np.concatenate([ids[:beam_width] for ids, _ in candidates])
+        scores = np.concatenate(
+            [live[b][2] + np.log(np.maximum(probs[:beam_width], 1e-30)) for b, (_, probs) in enumerate(candidates)]
+        )
+        best = top_k(scores, beam_width)[0]
+
+        new_live = []
+        for i in best:
+            b, next_id, score = int(beam_idx[i]), int(next_ids[i]), float(scores[i])
+            seq, words, _ = live[b]
+            next_word = vocab.word(next_id)
+            if not next_word or next_word == "<OOV>":
+                finished.append((words, score))
+            else:
+                new_live.append((seq + [next_id], words + [next_word], score))
+        live = new_live
+        # Scores only go down as beams grow, so stop once nothing live can win.
+        finished = sorted(finished, key=lambda f: -f[1])[:beam_width]
+        if not live or (len(finished) == beam_width and finished[-1][1] >= live[0][2]):
+            break
+
+    hypotheses = finished + [(words, score) for _, words, score in live]
+    return sorted(hypotheses, key=lambda h: -h[1])[:beam_width]
+
+
+# ---------------------- Micro-batching ----------------------
+class _PendingRequest:
+    def __init__(
+        self, tokens: List[int], num_words: int, decode_mode: str, skip_special: bool = False, deadline: float = None
+    ):
+        self.tokens = list(tokens)
+        self.remaining = num_words
+        self.decode_mode = decode_mode
+        self.skip_special = skip_special
+        # time.monotonic() after which no further step is started
+        self.deadline = deadline
+        self.state = None
+        # Streaming requests get each word as soon as its step finishes;
+        # None marks the end. Setting `cancelled` drops the request from the
+        # batch before its next step.
+        self.stream: "queue.Queue[str] | None" = None
+        self.cancelled = False
+        self.words: List[str] = []
+        self.error = None
+        self.done = threading.Event()
+
+
+class BatchDecoder:
+    """Greedy decoding of many requests at once, one model call per step.
+
+    Exact-mode requests are scored together with one forward pass over their
+    stacked ``(N, SEQ_LEN)`` windows; incremental-mode requests are advanced
+    together by one LSTM cell step on ``engine``. A request is done once it
+    has its ``num_words`` words or hits an unknown token; one whose deadline
+    has passed is dropped before the next step with DeadlineExceeded.
+    """
+
+    def __init__(self, model, engine: NumpyLSTM, vocab: Vocab):
+        self.model = model
+        self.engine = engine
+        self.vocab = vocab
+
+    def _incremental_next_ids(self, reqs: List[_PendingRequest]) -> List[int]:
+        fresh = [r for r in reqs if r.state is None]
+        carried = [r for r in reqs if r.state is not None]
+        if carried:
+            h = np.stack([r.state[0] for r in carried])
+            c = np.stack([r.state[1] for r in carried])
+            h, c = self.engine.step([r.tokens[-1] for r in carried], h, c)
+            for i, req in enumerate(carried):
+                req.state = (h[i], c[i])
+        if fresh:
+            contexts = np.array([pad_context(r.tokens) for r in fresh], dtype=np.int32)
+            h, c = self.engine.initial_state(contexts)
+            for i, req in enumerate(fresh):
+                req.state = (h[i], c[i])
+        probs = self.engine.output(np.stack([r.state[0] for r in reqs]))
+        skipping = [i for i, r in enumerate(reqs) if r.skip_special]
+        if skipping:
+            probs[np.ix_(skipping, list(self.vocab.special_ids))] = -1.0
+        return [int(i) for i in np.argmax(probs, axis=-1)]
+
+    def _step(self, active: List[_PendingRequest]):
+        next_ids = {}
+        exact = [r for r in active if r.decode_mode == "exact"]
+        if exact:
+            contexts = [pad_context(r.tokens) for r in exact]
+            candidates = next_token_candidates(self.model, self.vocab, contexts)
+            with _metrics.timer("select"):
+                for req, (ids, probs) in zip(exact, candidates):
+                    ids, _ = usable_candidates(self.vocab, ids, probs, req.skip_special)
+                    next_ids[id(req)] = int(ids[0])
+        incremental = [r for r in active if r.decode_mode == "incremental"]
+        if incremental:
+            with _metrics.timer("lstm_step"):
+                for req, next_id in zip(incremental, self._incremental_next_ids(incremental)):
+                    next_ids[id(req)] = next_id
+        for req in active:
+            next_id = next_ids[id(req)]
+            next_word = self.vocab.word(next_id)
+            if not next_word or next_word == "<OOV>":
+                req.remaining = 0
+                continue
+            req.words.append(next_word)
+            req.tokens.append(next_id)
+            req.remaining -= 1
+            if req.stream is not None:
+                req.stream.put(next_word)
+
+    def _finish(self, req: _PendingRequest):
+        req.done.set()
+        if req.stream is not None:
+            req.stream.put(None)
+
+    def _expire(self, active: List[_PendingRequest]) -> List[_PendingRequest]:
+        """`active` without the requests past their deadline, which are finished."""
+        live = []
+        for req in active:
+            if expired(req.deadline):
+                req.error = DeadlineExceeded(f"deadline exceeded after {len(req.words)} words")
+                self._finish(req)
+            else:
+                live.append(req)
+        return live
+
+    def decode(self, reqs: List[_PendingRequest]):
+        """Run `reqs` to completion in the calling thread.
+
+        A failing step sets ``error`` on every request still in the batch.
+        """
+        active = [r for r in reqs if r.remaining > 0]
+        while active:
+            active = self._expire(active)
+            if not active:
+                break
+            try:
+                self._step(active)
+            except Exception as e:
+                for req in active:
+                    req.error = e
+                break
+            active = [r for r in active if r.remaining > 0]
+
+
+class BatchScheduler(BatchDecoder):
+    """Decodes concurrent requests together, one model call per step.
+
+    Requests arriving within ``window_ms`` of the first one (or until
+    ``max_batch_size`` are waiting) are stacked into a single
+    ``(N, SEQ_LEN)`` array. Every decoding step scores all active requests
+    with one forward pass; a request leaves the batch as soon as it has its
+    ``num_words`` words (or hits an unknown token), and requests that arrive
+    meanwhile join at the next step. Incremental-mode requests are advanced
+    together by one LSTM cell step on ``engine``.
+    """
+
+    def __init__(self, model, engine: NumpyLSTM, vocab: Vocab, max_batch_size: int, window_ms: float):
+        super().__init__(model, engine, vocab)
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = max(0.0, window_ms) / 1000.0
+        self._queue: "queue.Queue[Optional[_PendingRequest]]" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        tokens: List[int],
+        num_words: int,
+        decode_mode: str = DECODE_MODE,
+        skip_special: bool = False,
+        deadline: float = None,
+    ) -> List[str]:
+        req = _PendingRequest(tokens, num_words, decode_mode, skip_special, deadline)
+        self._queue.put(req)
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.words
+
+    def stream(
+        self,
+        tokens: List[int],
+        num_words: int,
+        decode_mode: str = DECODE_MODE,
+        skip_special: bool = False,
+        deadline: float = None,
+    ) -> Iterator[str]:
+        """Yields words as they are decoded; closing the iterator cancels the request."""
+        req = _PendingRequest(tokens, num_words, decode_mode, skip_special, deadline)
+        req.stream = queue.Queue()
+        self._queue.put(req)
+        try:
+            while True:
+                word = req.stream.get()
+                if word is None:
+                    break
+                yield word
+            if req.error is not None:
+                raise req.error
+        finally:
+            req.cancelled = True
+
+    def close(self):
+        """Stop the scheduler thread once the requests it has are done."""
+        self._queue.put(None)
+
+    def _take(self, active: List[_PendingRequest], req: Optional[_PendingRequest]) -> bool:
+        # None is the close() sentinel
+        if req is None:
+            self._closed = True
+            return False
+        active.append(req)
+        return True
+
+    def _collect(self, active: List[_PendingRequest]):
+        if not active and not self._closed:
+            # Idle: block for the first request, then hold the batch open
+            # for the window so that concurrent arrivals share the step.
+            if not self._take(active, self._queue.get()):
+                return
+            deadline = time.monotonic() + self.window
+            while len(active) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    if not self._take(active, self._queue.get(timeout=timeout)):
+                        break
+                except queue.Empty:
+                    break
+        # Already decoding: top up with whatever is waiting, never stall.
+        while len(active) < self.max_batch_size:
+            try:
+                if not self._take(active, self._queue.get_nowait()):
+                    break
+            except queue.Empty:
+                break
+
+    def _run(self):
+        active: List[_PendingRequest] = []
+        while active or not self._closed:
+            self._collect(active)
+            active = self._expire([r for r in active if not r.cancelled])
+            if not active:
+                continue
+            try:
+                self._step(active)
+            except Exception as e:
+                for req in active:
+                    req.error = e
+                    self._finish(req)
+                active = []
+                continue
+            still_active = []
+            for req in active:
+                if req.remaining > 0 and not req.cancelled:
+                    still_active.append(req)
+                else:
+                    self._finish(req)
+            active = still_active
 
 
 # ---------------------- App bootstrap ----------------------
-_raw_text = read_dataset(DATASET_FILE)
-_tokenizer = build_or_load_tokenizer(_raw_text)
-_vocab_size = min(MAX_VOCAB, len(_tokenizer.word_index) + 1)
-_model = build_or_load_model(_vocab_size)
-train_if_needed(_model, _tokenizer, _raw_text)
+# Loading runs in a background thread so Flask can bind its port right away;
+# /ready reports when the model is loaded and warmed up.
+_model = None
+_tokenizer = None
+_vocab = None
+_engine = None
+_scheduler = None
+_continuation_index = None
+_ready = threading.Event()
+_startup = {"status": "starting", "phases_ms": {}, "error": None, "bundle_id": None}
+
+
+class _phase:
+    """Times one startup phase into _startup["phases_ms"] and the log."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        _startup["phases_ms"][self.name] = round(elapsed_ms, 1)
+        log.info("startup phase %-18s %8.1f ms", self.name, elapsed_ms)
+
+
+def ensure_flat_weights() -> str:
+    """Convert ENGINE_FILE to FLAT_WEIGHTS_FILE unless it is already up to date."""
+    if os.path.exists(FLAT_WEIGHTS_FILE):
+        try:
+            flat_meta = read_bundle_meta(FLAT_WEIGHTS_FILE)
+        except (OSError, ValueError, KeyError):
+            # Written in an older layout: rebuild it from ENGINE_FILE
+            log.warning("unreadable %s, rebuilding", FLAT_WEIGHTS_FILE)
+            flat_meta = None
+        if flat_meta is not None and not os.path.exists(ENGINE_FILE):
+            return FLAT_WEIGHTS_FILE
+        if flat_meta is not None and flat_meta.get("bundle_id") == read_bundle_meta(ENGINE_FILE).get("bundle_id"):
+            return FLAT_WEIGHTS_FILE
+    with _phase("write_flat_weights"):
+        NumpyLSTM.load(ENGINE_FILE).write_flat(FLAT_WEIGHTS_FILE)
+    return FLAT_WEIGHTS_FILE
+
+
+def tokenizer_source():
+    """Identity of TOKENIZER_FILE that VOCAB_FILE records (None if there is no file)."""
+    if not os.path.exists(TOKENIZER_FILE):
+        return None
+    return "tokenizer:" + corpus.file_digest(TOKENIZER_FILE)
+
+
+def load_vocab(source: str, tokenizer=None):
+    """VOCAB_FILE if it was built from `source`, else rewritten from `tokenizer`.
+
+    Returns None when the file is missing or stale and no tokenizer is given.
+    """
+    try:
+        if os.path.exists(VOCAB_FILE) and read_vocab_source(VOCAB_FILE) == source:
+            return Vocab.load(VOCAB_FILE)
+    except (OSError, ValueError):
+        log.warning("unreadable %s, rebuilding", VOCAB_FILE)
+    if tokenizer is None:
+        return None
+    with _phase("write_vocab"):
+        write_vocab_from_tokenizer(VOCAB_FILE, tokenizer, source)
+    return Vocab.load(VOCAB_FILE)
+
+
+def model_source() -> str:
+    """Identity of the loaded weights that derived artifacts record.
+
+    It is the bundle id on both backends - for a Keras model the one
+    `export_keras_model` would write - so the same weights have the same
+    source whichever backend serves them.
+    """
+    if isinstance(_model, NumpyLSTM):
+        return f"bundle:{_model.meta.get('bundle_id')}"
+    words = [_vocab.word(i) or "" for i in range(len(_vocab))]
+    return f"bundle:{keras_bundle_id(_model, words)}"
+
+
+def load_continuation_index():
+    """CONTINUATION_INDEX_FILE if it was built for the loaded model, else None."""
+    if not os.path.exists(CONTINUATION_INDEX_FILE):
+        return None
+    try:
+        header = read_index_header(CONTINUATION_INDEX_FILE)
+        if header is None:
+            raise ValueError("bad magic")
+        if header.get("source") != model_source() or header.get("seq_len") != SEQ_LEN:
+            log.warning("%s was built for another model, ignoring it", CONTINUATION_INDEX_FILE)
+            return None
+        if header.get("k", 0) < CANDIDATES_K:
+            log.warning(
+                "%s keeps %s candidates, %d needed; ignoring it", CONTINUATION_INDEX_FILE, header.get("k"), CANDIDATES_K
+            )
+            return None
+        return ContinuationIndex.load(CONTINUATION_INDEX_FILE)
+    except (OSError, ValueError, KeyError) as e:
+        log.warning("unreadable %s (%s), ignoring it", CONTINUATION_INDEX_FILE, e)
+        return None
+
+
+def load_artifacts() -> bool:
+    """Load the model to serve; False when there is none yet (it has to be trained)."""
+    global _model, _tokenizer, _vocab, _engine, _continuation_index, SEQ_LEN
+    _tokenizer = _vocab = _continuation_index = None
+    if INFERENCE_BACKEND == "numpy":
+        path = ensure_flat_weights() if WORKERS > 1 else ENGINE_FILE
+        with _phase("load_bundle"):
+            _model = NumpyLSTM.load(path)
+        _tokenizer = _model.tokenizer
+        if _model.seq_len and _model.seq_len != SEQ_LEN:
+            log.warning("SEQ_LEN=%d overridden by bundle (%d)", SEQ_LEN, _model.seq_len)
+            SEQ_LEN = _model.seq_len
+        _startup["bundle_id"] = _model.meta.get("bundle_id")
+        with _phase("load_vocab"):
+            _vocab = load_vocab(f"bundle:{_startup['bundle_id']}", _tokenizer)
+    else:
+        with _phase("import_tensorflow"):
+            import tensorflow as tf
+
+            if WORKER_THREADS > 0:
+                tf.config.threading.set_intra_op_parallelism_threads(WORKER_THREADS)
+        # EPOCHS=0 serves the untrained model without saving it (benchmarks)
+        if not os.path.exists(MODEL_FILE) and EPOCHS > 0:
+            return False
+        with _phase("load_vocab"):
+            source = tokenizer_source()
+            _vocab = load_vocab(source) if source else None
+        # The pickled Tokenizer is only needed to (re)build artifacts.
+        if _vocab is None or not (os.path.exists(MODEL_FILE) and os.path.exists(ENGINE_FILE)):
+            with _phase("load_tokenizer"):
+                _tokenizer = build_or_load_tokenizer(DATASET_FILE)
+        vocab_size = len(_vocab) if _tokenizer is None else min(MAX_VOCAB, len(_tokenizer.word_index) + 1)
+        with _phase("load_model"):
+            _model = build_or_load_model(vocab_size)
+        if os.path.exists(MODEL_FILE) and not os.path.exists(ENGINE_FILE):
+            # Next start can use INFERENCE_BACKEND=numpy without the corpus.
+            with _phase("export_bundle"):
+                export_keras_model(_model, _tokenizer, ENGINE_FILE)
+        if _vocab is None:
+            _vocab = load_vocab(tokenizer_source(), _tokenizer)
+
+    with _phase("build_engine"):
+        _engine = _model if isinstance(_model, NumpyLSTM) else NumpyLSTM.from_keras(_model)
+    with _phase("load_continuation_index"):
+        _continuation_index = load_continuation_index()
+    return True
+
+
+def start_runtime():
+    """Per-process serving state: the scheduler thread, then warm-up."""
+    global _scheduler
+    _scheduler = (
+        BatchScheduler(_model, _engine, _vocab, BATCH_MAX_SIZE, BATCH_WINDOW_MS)
+        if ENABLE_BATCHING
+        else None
+    )
+    with _phase("warm_up"):
+        warm_up()
+
+
+def warm_up():
+    """Run representative predictions through every decoding path."""
+    for prompt in WARMUP_PROMPTS:
+        for decode_mode in DECODE_MODES:
+            predict_words(prompt, 3, decode_mode)
+    if _cache is not None:
+        _cache.clear()
+
+
+def bootstrap(load: bool = True):
+    started = time.perf_counter()
+    try:
+        if load and not load_artifacts():
+            # Nothing to serve until the first job's model is installed;
+            # inference answers 503 with its progress meanwhile.
+            _startup["status"] = "training"
+            start_training(default_train_params())
+        else:
+            start_runtime()
+            _startup["status"] = "ready"
+    except Exception as e:
+        _startup["status"] = "failed"
+        _startup["error"] = str(e)
+        log.exception("startup failed")
+    finally:
+        _startup["phases_ms"]["total"] = round((time.perf_counter() - started) * 1000, 1)
+        log.info("startup %s in %.1f ms", _startup["status"], _startup["phases_ms"]["total"])
+        if _startup["status"] != "training":
+            _ready.set()
+
+
+def wait_until_ready(timeout: float = None) -> bool:
+    _ready.wait(timeout)
+    return _startup["status"] == "ready"
+
+
+# ---------------------- Training ----------------------
+# Jobs train on their own thread while the current model (if any) keeps
+# serving; the new model replaces it only once it is trained and saved.
+def default_train_params() -> dict:
+    return {
+        "dataset": DATASET_FILE,
+        "epochs": EPOCHS,
+        "batch_size": BATCH_SIZE,
+        "max_vocab": MAX_VOCAB,
+        "embed_dim": EMBED_DIM,
+        "lstm_units": LSTM_UNITS,
+    }
+
+
+def parse_train_args(data) -> dict:
+    """Validated /train parameters over the configured defaults; raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError("request body must be a JSON object")
+    params = default_train_params()
+    for key, limit in TRAIN_LIMITS.items():
+        if data.get(key) is None:
+            continue
+        try:
+            value = int(data[key])
+        except (TypeError, ValueError):
+            raise ValueError(f"{key} must be an integer")
+        if not 1 <= value <= limit:
+            raise ValueError(f"{key} must be between 1 and {limit}")
+        params[key] = value
+    if data.get("dataset"):
+        root = os.path.realpath(TRAIN_DATA_DIR)
+        path = os.path.realpath(os.path.join(TRAIN_DATA_DIR, str(data["dataset"])))
+        if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+            raise ValueError(f"dataset must name a file in {TRAIN_DATA_DIR}")
+        params["dataset"] = path
+    return params
+
+
+def check_train_token():
+    """Raises PermissionError unless the request carries TRAIN_TOKEN."""
+    if not TRAIN_TOKEN:
+        raise PermissionError("training over HTTP is disabled (TRAIN_TOKEN is not set)")
+    token = request.headers.get("X-Train-Token", "")
+    if not hmac.compare_digest(token.encode("utf-8"), TRAIN_TOKEN.encode("utf-8")):
+        raise PermissionError("invalid X-Train-Token")
+
+
+def start_training(params: dict) -> TrainingJob:
+    """Start a background job for `params`; raises TrainingBusy if one is running."""
+    job = _training.start(params, run_training)
+    log.info("training job %s started: %s", job.id, params)
+    return job
+
+
+def run_training(job: TrainingJob):
+    try:
+        train_model(job)
+    except Exception as e:
+        log.exception("training job %s failed", job.id)
+        if _startup["status"] == "training":
+            _startup.update(status="failed", error=f"training failed: {e}")
+            _ready.set()
+        raise
+    log.info("training job %s done, final loss %s", job.id, job.history[-1]["loss"] if job.history else None)
+
+
+def train_model(job: TrainingJob):
+    """Fit a tokenizer and a new model per job.params, save both and serve them."""
+    params = job.params
+    tokenizer = corpus.fit_tokenizer(params["dataset"], params["max_vocab"], oov_token="<OOV>")
+    ids = dataset_token_ids(tokenizer, params["dataset"])
+    if len(ids) <= SEQ_LEN:
+        raise ValueError(f"{params['dataset']} has too few tokens to train on")
+    vocab_size = min(params["max_vocab"], len(tokenizer.word_index) + 1)
+    model = build_model(vocab_size, params["embed_dim"], params["lstm_units"])
+    job.begin(len(ids) - SEQ_LEN, params["batch_size"])
+    model.fit(
+        make_dataset(ids, params["batch_size"]),
+        epochs=params["epochs"],
+        verbose=0,
+        callbacks=[progress_callback(job)],
+    )
+    save_trained(model, tokenizer)
+    install_model(model, tokenizer)
+
+
+def _replace_with(path: str, write):
+    """write(tmp_path), then move the result over `path` in one step.
+
+    The temporary name keeps the extension, which Keras and np.savez go by.
+    """
+    base, ext = os.path.splitext(path)
+    tmp_path = f"{base}.tmp{ext}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save_trained(model, tokenizer: Tokenizer):
+    """MODEL_FILE, TOKENIZER_FILE and ENGINE_FILE for the next start, each replaced atomically."""
+
+    def dump_tokenizer(path):
+        with open(path, "wb") as f:
+            pickle.dump(tokenizer, f)
+
+    _replace_with(MODEL_FILE, model.save)
+    _replace_with(TOKENIZER_FILE, dump_tokenizer)
+    _replace_with(ENGINE_FILE, lambda path: export_keras_model(model, tokenizer, path))
+
+
+def install_model(model, tokenizer: Tokenizer):
+    """Serve a newly trained model in place of the current one.
+
+    The engine and vocabulary are built first; the swap itself waits for
+    requests in flight, replaces the model globals and the batch scheduler,
+    and reloads the continuation index, which no longer matches (its source
+    is the model). Then the new model is warmed up.
+    """
+    global _model, _tokenizer, _vocab, _engine, _scheduler, _continuation_index
+    if INFERENCE_BACKEND == "numpy":
+        model = NumpyLSTM.load(ENGINE_FILE)
+        tokenizer = model.tokenizer
+        source = f"bundle:{model.meta.get('bundle_id')}"
+    else:
+        source = tokenizer_source()
+    engine = model if isinstance(model, NumpyLSTM) else NumpyLSTM.from_keras(model)
+    vocab = load_vocab(source, tokenizer)
+    with _model_gate.swap():
+        previous = _scheduler
+        _model, _tokenizer, _vocab, _engine = model, tokenizer, vocab, engine
+        _continuation_index = load_continuation_index()
+        _scheduler = (
+            BatchScheduler(_model, _engine, _vocab, BATCH_MAX_SIZE, BATCH_WINDOW_MS) if ENABLE_BATCHING else None
+        )
+        if previous is not None:
+            previous.close()
+        if isinstance(model, NumpyLSTM):
+            _startup["bundle_id"] = model.meta.get("bundle_id")
+    warm_up()
+    if _startup["status"] == "training":
+        _startup["status"] = "ready"
+        _ready.set()
+    log.info("serving the newly trained model")
+
+
+def predict_words(
+    text: str,
+    num_words: int,
+    decode_mode: str = DECODE_MODE,
+    skip_special: bool = False,
+    deadline: float = None,
+    alone: bool = False,
+    timeout_ms: float = 0.0,
+) -> List[str]:
+    """Greedy completion of `text`.
+
+    With `alone` the request decodes in the calling thread, without the batch
+    scheduler or single-flight, so that a profile of the thread sees all of
+    its work. `timeout_ms` is the budget the request asked for, which
+    `deadline` was derived from; it is part of the single-flight key.
+    """
+    with _metrics.timer("tokenize"):
+        tokens = _vocab.texts_to_sequences([text])[0]
+
+    def decode():
+        with _metrics.timer("decode"):
+            if _scheduler is None or alone:
+                if decode_mode == "incremental":
+                    words = iter_incremental(_vocab, _engine, text, num_words, skip_special)
+                else:
+                    words = iter_greedy(_vocab, _model, text, num_words, skip_special)
+                return list(until_deadline(words, num_words, deadline))
+            return _scheduler.submit(tokens, num_words, decode_mode, skip_special, deadline)
+
+    if alone:
+        return decode()
+    # Decoding only ever sees the padded last SEQ_LEN ids, so prompts that
+    # differ before them (or only in case and punctuation) share the result.
+    key = ("words", tuple(pad_context(tokens)), num_words, decode_mode, skip_special, timeout_ms)
+    return coalesced(key, decode, deadline)
+
+
+def stream_words(
+    text: str, num_words: int, decode_mode: str = DECODE_MODE, skip_special: bool = False, deadline: float = None
+) -> Iterator[str]:
+    if _scheduler is None:
+        if decode_mode == "incremental":
+            words = iter_incremental(_vocab, _engine, text, num_words, skip_special)
+        else:
+            words = iter_greedy(_vocab, _model, text, num_words, skip_special)
+        return until_deadline(words, num_words, deadline)
+    tokens = _vocab.texts_to_sequences([text])[0]
+    return _scheduler.stream(tokens, num_words, decode_mode, skip_special, deadline)
+
+
+def next_word_candidates(texts: List[str], k: int, skip_special: bool = False) -> List[List[dict]]:
+    """The `k` most likely next words after each text, with probabilities.
+
+    All texts are scored in one forward pass (or served from the prediction
+    cache, which the following greedy step then hits as well).
+    """
+    contexts = [pad_context(tokens) for tokens in _vocab.texts_to_sequences(texts)]
+    results = []
+    for ids, probs in next_token_candidates(_model, _vocab, contexts):
+        ids, probs = usable_candidates(_vocab, ids, probs, skip_special)
+        results.append(
+            [
+                {"word": _vocab.word(int(i)), "id": int(i), "probability": round(float(p), 6)}
+                for i, p in zip(ids[:k], probs[:k])
+            ]
+        )
+    return results
+
+
+def complete_word(text: str, limit: int) -> dict:
+    """Completions of the unfinished last word of `text`, most likely first.
+
+    Vocabulary words starting with the fragment come from a binary search of
+    the sorted string table (most frequent first), and are re-ranked by the
+    model's next-word distribution for the text before the fragment; the
+    stable sort keeps frequency order among equal probabilities. Without a
+    fragment (text ends in a separator) these are the likeliest next words.
+
+    The context is scored by the NumPy engine whatever the backend: one
+    window is far cheaper there than a Keras call, with the same output.
+    """
+    with _metrics.timer("tokenize"):
+        context, fragment = _vocab.split_fragment(text)
+        tokens = _vocab.texts_to_sequences([context])[0]
+    with _metrics.timer("model_predict"):
+        probs = _engine.predict(np.array([pad_context(tokens)], dtype=np.int32))[0]
+    with _metrics.timer("select"):
+        if fragment:
+            ids = _vocab.ids_with_prefix(fragment, COMPLETE_MAX_MATCHES)
+            ids = ids[np.argsort(-probs[ids], kind="stable")[:limit]]
+        else:
+            probs = probs.copy()
+            probs[list(_vocab.special_ids)] = -1.0
+            ids, _ = top_k(probs, limit)
+    return {
+        "context": context,
+        "prefix": fragment,
+        "completions": [
+            {"word": _vocab.word(int(i)), "id": int(i), "probability": round(float(probs[i]), 6)} for i in ids
+        ],
+    }
 
 
 # ---------------------- Routes ----------------------
+@app.before_request
+def _start_request_timer():
+    g.metrics_start = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    # For /predict/stream this is the time to the response headers; the
+    # whole stream is the "stream" stage.
+    start = g.get("metrics_start")
+    if start is not None and _metrics.enabled:
+        endpoint = request.endpoint or "unknown"
+        _metrics.observe(f"request:{endpoint}", time.perf_counter() - start)
+        _metrics.inc("requests", endpoint=endpoint, status=response.status_code)
+        if response.status_code >= 400:
+            _metrics.inc("errors", endpoint=endpoint, status=response.status_code)
+    return response
+
+
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok"})
+    # Always 200 while the process is up; "saturated" means new inference
+    # requests are currently being turned away (see /ready)
+    return jsonify({"status": "saturated" if _admission.saturated else "ok", "admission": _admission.stats()})
+
+
+def process_memory() -> dict:
+    """Resident memory of this process, split into anonymous and file-backed (Linux)."""
+    info = {"pid": os.getpid(), "worker": _startup.get("worker")}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "RssAnon:", "RssFile:")):
+                    key, value = line.split(":", 1)
+                    info[key.lower() + "_kb"] = int(value.split()[0])
+    except OSError:
+        pass
+    return info
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    if _startup["status"] == "ready" and _admission.saturated:
+        # Ready but full: a load balancer should route elsewhere for now.
+        response = jsonify({"status": "saturated", "startup": _startup, "admission": _admission.stats()})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(_admission.retry_after_s())
+        return response
+    body = {"status": _startup["status"], "startup": _startup}
+    job = _training.current()
+    if _startup["status"] == "training" and job is not None:
+        response = jsonify({**body, "training": job.status()})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(training_retry_after_s(job))
+        return response
+    return jsonify(body), (200 if _startup["status"] == "ready" else 503)
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify(
+        {
+            "cache": _cache.stats() if _cache is not None else None,
+            "single_flight": _single_flight.stats() if _single_flight is not None else None,
+            "continuation_index": _continuation_index.stats() if _continuation_index is not None else None,
+            "admission": _admission.stats(),
+            "stream": _stream_stats.stats(),
+            "latency": _metrics.stats(),
+            "profiling": {
+                **_profiles.stats(),
+                "sample_every": _profile_sampler.every,
+                "sampled": _profile_sampler.sampled,
+            },
+            "training": _training.stats(),
+            "startup": _startup,
+            "process": process_memory(),
+        }
+    )
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text format: stage latency histograms, counters and gauges."""
+    admission = _admission.stats()
+    gauges = [
+        ("queue_depth", "Requests admitted and not yet finished.", admission["queue_depth"]),
+        ("rejected_full", "Requests refused with 429 because the queue was full.", admission["rejected_full"]),
+        ("rejected_deadline", "Requests refused with 503 to avoid a missed deadline.", admission["rejected_deadline"]),
+        ("deadline_exceeded", "Admitted requests stopped at their deadline.", admission["deadline_exceeded"]),
+    ]
+    if _cache is not None:
+        cache = _cache.stats()
+        gauges += [
+            ("cache_hits", "Prediction cache hits.", cache["hits"]),
+            ("cache_misses", "Prediction cache misses.", cache["misses"]),
+        ]
+    if _single_flight is not None:
+        gauges.append(("coalesced", "Requests served by an identical in-flight request.", _single_flight.coalesced))
+    if _continuation_index is not None:
+        hits = _continuation_index.hits
+        gauges.append(("continuation_index_hits", "Contexts served from the continuation index.", hits))
+    return Response(_metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
+
+def parse_predict_args(data) -> dict:
+    """Validated /predict parameters; raises ValueError with a client message."""
+    if not isinstance(data, dict):
+        raise ValueError("request body must be a JSON object")
+    text = data.get("text")
+    if text is not None and not isinstance(text, str):
+        raise ValueError("text must be a string")
+    text = (text or "").strip()
+    if not text:
+        raise ValueError("text is required")
+    try:
+        num_words = int(data.get("num_words") or 1)
+        beam_width = int(data.get("beam_width") or 1)
+        k = int(data.get("top_k") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("num_words, beam_width and top_k must be integers")
+    try:
+        timeout_ms = float(data.get("timeout_ms") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("timeout_ms must be a number")
+    decode_mode = data.get("decode_mode") or DECODE_MODE
+    if decode_mode not in DECODE_MODES:
+        raise ValueError(f"decode_mode must be one of {', '.join(DECODE_MODES)}")
+    # JSON booleans, or "1"/"true" from a query string
+    skip_special = str(data.get("skip_special", "")).lower() in ("1", "true", "yes")
+    return {
+        "text": text,
+        "num_words": max(1, min(num_words, 10)),
+        "decode_mode": decode_mode,
+        "beam_width": max(1, min(beam_width, MAX_BEAM_WIDTH, CACHE_TOP_K)),
+        "top_k": max(0, min(k, CACHE_TOP_K)),
+        "skip_special": skip_special,
+        # Capped at REQUEST_TIMEOUT_MS, which is also the default (0), so
+        # requests with the same budget share single-flight keys
+        "timeout_ms": min(timeout_ms, REQUEST_TIMEOUT_MS) if timeout_ms > 0 else REQUEST_TIMEOUT_MS,
+    }
+
+
+def overloaded(message: str, status: int, retry_after_s: int):
+    """A 429/503 response telling the client when to retry."""
+    response = jsonify({"error": message})
+    response.status_code = status
+    response.headers["Retry-After"] = str(retry_after_s)
+    return response
+
+
+def training_retry_after_s(job: TrainingJob) -> int:
+    """Seconds until the job's model should be served, for Retry-After."""
+    eta = job.eta_s()
+    return max(1, min(int(eta) + 1, 300)) if eta is not None else 10
+
+
+def not_ready_response():
+    """503 while there is no model to serve; during the first training job
+    it carries the job's progress and a Retry-After for its expected end."""
+    status = _startup["status"]
+    job = _training.current()
+    if status != "training" or job is None:
+        return jsonify({"error": f"model is not ready ({status})", "status": status}), 503
+    response = jsonify(
+        {
+            "error": f"no model yet: training ({len(job.history)}/{job.epochs} epochs done)",
+            "status": "training",
+            "training": job.status(),
+        }
+    )
+    response.status_code = 503
+    response.headers["Retry-After"] = str(training_retry_after_s(job))
+    return response
+
+
+def deadline_response(e: DeadlineExceeded):
+    _admission.record_deadline_exceeded()
+    return overloaded(str(e), 503, _admission.retry_after_s())
+
+
+def requested_profile() -> Optional[str]:
+    """Profile mode asked for by the request (None if none); raises ValueError
+    for an unknown mode and PermissionError without the right token."""
+    mode = (request.headers.get("X-Profile") or request.args.get("profile") or "").lower()
+    if not mode:
+        return None
+    if mode in ("1", "true", "yes"):
+        mode = "timings"
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"profile must be one of {', '.join(PROFILE_MODES)}")
+    check_profile_token()
+    return mode
+
+
+def check_profile_token():
+    """Raises PermissionError unless the request carries PROFILE_TOKEN."""
+    if not PROFILE_TOKEN:
+        raise PermissionError("profiling is disabled (PROFILE_TOKEN is not set)")
+    token = request.headers.get("X-Profile-Token", "")
+    if not hmac.compare_digest(token.encode("utf-8"), PROFILE_TOKEN.encode("utf-8")):
+        raise PermissionError("invalid X-Profile-Token")
+
+
+def profiled(fn, mode: str, label: str):
+    """(fn(), report): the stages fn timed in this thread, and with mode
+    "cprofile" a capture saved to the profile ring with its hot spots."""
+    profiler = _profiles.start() if mode == "cprofile" else None
+    started = time.perf_counter()
+    profile_id = None
+    try:
+        with _metrics.trace() as spans:
+            result = fn()
+    finally:
+        if profiler is not None:
+            profile_id = _profiles.stop(profiler, label)
+    stages = {}
+    for stage, seconds in spans:
+        entry = stages.setdefault(stage, {"count": 0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] += seconds * 1000
+    report = {
+        "mode": mode,
+        "total_ms": round((time.perf_counter() - started) * 1000, 3),
+        "stages": {stage: {**e, "total_ms": round(e["total_ms"], 3)} for stage, e in stages.items()},
+    }
+    if mode == "cprofile":
+        if profiler is None:
+            report["cprofile"] = "skipped: another request is being profiled"
+        else:
+            report.update(profile_id=profile_id, hotspots=hotspots(profiler))
+    return result, report
+
+
+def _predict_result(args: dict, deadline: float, alone: bool = False) -> dict:
+    """The /predict response body (see predict)."""
+    result = {}
+    if args["top_k"]:
+        result["candidates"] = next_word_candidates([args["text"]], args["top_k"], args["skip_special"])[0]
+
+    if args["beam_width"] > 1:
+
+        def search():
+            return beam_search(
+                _vocab,
+                _model,
+                args["text"],
+                args["num_words"],
+                args["beam_width"],
+                args["skip_special"],
+                deadline,
+            )
+
+        context = tuple(pad_context(_vocab.texts_to_sequences([args["text"]])[0]))
+        key = ("beam", context, args["num_words"], args["beam_width"], args["skip_special"], args["timeout_ms"])
+        with _metrics.timer("beam_search"):
+            beams = search() if alone else coalesced(key, search, deadline)
+        alternatives = [
+            {"completion": " ".join(words), "words": words, "score": round(score, 4)} for words, score in beams
+        ]
+        best = alternatives[0]
+        result.update(completion=best["completion"], words=best["words"], alternatives=alternatives)
+    else:
+        words = predict_words(
+            args["text"],
+            args["num_words"],
+            args["decode_mode"],
+            args["skip_special"],
+            deadline,
+            alone,
+            args["timeout_ms"],
+        )
+        result.update(completion=" ".join(words), words=words)
+    return result
 
 
 @app.route("/predict", methods=["POST"])
 def predict():
+    """Greedy or beam completion of one prompt.
+
+    A request with ``X-Profile: timings|cprofile`` (or ``?profile=``) and a
+    matching ``X-Profile-Token`` decodes on its own in the request thread and
+    gets a ``profile`` with its per-stage timings; ``cprofile`` also saves a
+    capture to the profile ring. Every ``PROFILE_SAMPLE_EVERY``-th request is
+    captured the same way without changing its response.
+    """
     try:
-        data = request.get_json(force=True)
-        text = (data.get("text") or "").strip()
-        num_words = int(data.get("num_words") or 1)
-        num_words = max(1, min(num_words, 10))
-        if not text:
+        try:
+            with _metrics.timer("parse"):
+                data = request.get_json(force=True, silent=True)
+                args = parse_predict_args(data)
+                profile = requested_profile()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except PermissionError as e:
+            return jsonify({"error": str(e)}), 403
+        if _startup["status"] != "ready":
+            return not_ready_response()
+        try:
+            ticket = _admission.admit(args["timeout_ms"], args["num_words"])
+        except Rejected as e:
+            return overloaded(str(e), e.status, e.retry_after_s)
+
+        try:
+            with _model_gate.use():
+                if profile is not None:
+                    result, report = profiled(
+                        lambda: _predict_result(args, ticket.deadline, True), profile, "requested"
+                    )
+                    result["profile"] = report
+                elif _profile_sampler.sample():
+                    result, _ = profiled(lambda: _predict_result(args, ticket.deadline, True), "cprofile", "sampled")
+                else:
+                    result = _predict_result(args, ticket.deadline)
+            _metrics.inc("tokens_generated", len(result["words"]), endpoint="predict")
+            with _metrics.timer("serialize"):
+                return jsonify(result)
+        except DeadlineExceeded as e:
+            ticket.release(record=False)
+            return deadline_response(e)
+        finally:
+            ticket.release()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/profiles", methods=["GET"])
+def list_profiles():
+    """cProfile captures in the profile ring, newest first (needs X-Profile-Token)."""
+    try:
+        check_profile_token()
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    return jsonify({"profiles": _profiles.names(), **_profiles.stats()})
+
+
+@app.route("/profiles/<name>", methods=["GET"])
+def get_profile(name: str):
+    """One capture as a pstats file, e.g. for `python -m pstats` or snakeviz."""
+    try:
+        check_profile_token()
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    path = _profiles.path(name)
+    if path is None:
+        return jsonify({"error": f"no profile named {name}"}), 404
+    return send_file(os.path.abspath(path), mimetype="application/octet-stream", as_attachment=True)
+
+
+def predict_batch_items(prompts: list, defaults: dict, deadline: float = None) -> list:
+    """/predict/batch results for `prompts`, in order (see predict_batch).
+
+    A prompt is a string, an object of /predict arguments over `defaults`, or
+    the ValueError its caller hit reading it, which becomes its ``error``
+    like any other invalid prompt. Also used by scripts/bulk_complete.py.
+    """
+    results = [None] * len(prompts)
+    accepted = []
+    for i, item in enumerate(prompts):
+        if isinstance(item, ValueError):
+            results[i] = {"error": str(item)}
+            continue
+        if isinstance(item, str):
+            item = {"text": item}
+        if not isinstance(item, dict):
+            results[i] = {"error": "each prompt must be a string or an object"}
+            continue
+        try:
+            args = parse_predict_args({**defaults, **item})
+            if args["beam_width"] > 1:
+                raise ValueError("beam_width is not supported by /predict/batch")
+        except ValueError as e:
+            results[i] = {"error": str(e)}
+            continue
+        accepted.append((i, args))
+
+    # One lookup pass over every word of the batch; about 1.5x faster than
+    # per-word Vocab lookups from a dozen prompts up.
+    token_lists = fast_tokenizer(_vocab).texts_to_sequences([args["text"] for _, args in accepted])
+    reqs = [
+        _PendingRequest(tokens, args["num_words"], args["decode_mode"], args["skip_special"], deadline)
+        for (_, args), tokens in zip(accepted, token_lists)
+    ]
+    BatchDecoder(_model, _engine, _vocab).decode(reqs)
+    for (i, _), req in zip(accepted, reqs):
+        if req.error is not None:
+            results[i] = {"error": str(req.error)}
+        else:
+            results[i] = {"completion": " ".join(req.words), "words": req.words}
+
+    # Candidates for every item that asked, in one more batched call.
+    # The contexts were scored by the first decoding step, so with the
+    # prediction cache on these are cache hits.
+    wanted = [(i, args) for i, args in accepted if args["top_k"] and "error" not in results[i]]
+    for skip_special in (False, True):
+        group = [(i, args) for i, args in wanted if args["skip_special"] == skip_special]
+        if group:
+            k = max(args["top_k"] for _, args in group)
+            for (i, args), candidates in zip(
+                group, next_word_candidates([args["text"] for _, args in group], k, skip_special)
+            ):
+                results[i]["candidates"] = candidates[: args["top_k"]]
+    return results
+
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """Many prompts per call, decoded together with one forward pass per step.
+
+    Each prompt is a string or an object with its own ``text``, ``num_words``,
+    ``decode_mode``, ``top_k`` and ``skip_special``; the same top-level keys
+    are the defaults. Results come back in request order, and an invalid prompt gets
+    an ``error`` in its slot instead of failing the whole batch. The call is
+    admitted as one request; items still decoding at its deadline get a
+    deadline ``error``.
+    """
+    try:
+        data = request.get_json(force=True, silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "request body must be a JSON object"}), 400
+        prompts = data.get("prompts")
+        if not isinstance(prompts, list) or not prompts:
+            return jsonify({"error": "prompts must be a non-empty list"}), 400
+        if len(prompts) > PREDICT_BATCH_MAX_ITEMS:
+            return jsonify({"error": f"at most {PREDICT_BATCH_MAX_ITEMS} prompts per batch"}), 413
+        if _startup["status"] != "ready":
+            return not_ready_response()
+        try:
+            timeout_ms = float(data.get("timeout_ms") or 0)
+        except (TypeError, ValueError):
+            return jsonify({"error": "timeout_ms must be a number"}), 400
+        try:
+            ticket = _admission.admit(timeout_ms)
+        except Rejected as e:
+            return overloaded(str(e), e.status, e.retry_after_s)
+        try:
+            with _model_gate.use():
+                defaults = {key: data[key] for key in BATCH_ITEM_KEYS if key in data}
+                results = predict_batch_items(prompts, defaults, ticket.deadline)
+            generated = sum(len(r.get("words", ())) for r in results)
+            _metrics.inc("tokens_generated", generated, endpoint="predict_batch")
+            with _metrics.timer("serialize"):
+                return jsonify({"results": results})
+        finally:
+            # One call decodes many prompts; its time says little about the
+            # wait of a single request.
+            ticket.release(record=False)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/complete", methods=["GET", "POST"])
+def complete():
+    """Autocomplete the partially typed last word; cheap enough to call per keystroke."""
+    try:
+        data = request.get_json(force=True, silent=True) if request.method == "POST" else request.args
+        data = data or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "request body must be a JSON object"}), 400
+        text = data.get("text") or ""
+        if not isinstance(text, str):
+            return jsonify({"error": "text must be a string"}), 400
+        if not text.strip():
             return jsonify({"error": "text is required"}), 400
+        try:
+            limit = int(data.get("limit") or 5)
+        except (TypeError, ValueError):
+            return jsonify({"error": "limit must be an integer"}), 400
+        if _startup["status"] != "ready":
+            return not_ready_response()
+        with _model_gate.use():
+            result = complete_word(text, max(1, min(limit, COMPLETE_MAX_LIMIT)))
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.route("/predict/stream", methods=["GET", "POST"])
+def predict_stream():
+    """Server-Sent Events: one `word` event per decoding step, then `done`.
+
+    When the client disconnects the server fails to write the next event and
+    closes the generator, which cancels the decode before its next step.
+    """
+    started = time.perf_counter()
+    data = request.get_json(silent=True) if request.method == "POST" else None
+    try:
+        args = parse_predict_args(data or request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if _startup["status"] != "ready":
+        return not_ready_response()
+    try:
+        ticket = _admission.admit(args["timeout_ms"], args["num_words"])
+    except Rejected as e:
+        return overloaded(str(e), e.status, e.retry_after_s)
+
+    def events():
+        words = []
+        words_iter = stream_words(
+            args["text"], args["num_words"], args["decode_mode"], args["skip_special"], ticket.deadline
+        )
+        completed = False
+        try:
+            for word in words_iter:
+                if not words:
+                    _stream_stats.first_word((time.perf_counter() - started) * 1000)
+                words.append(word)
+                yield _sse("word", {"index": len(words) - 1, "word": word})
+            completed = True
+            yield _sse("done", {"completion": " ".join(words), "words": words})
+        except Exception as e:
+            completed = True
+            if isinstance(e, DeadlineExceeded):
+                _admission.record_deadline_exceeded()
+            yield _sse("error", {"error": str(e)})
+        finally:
+            words_iter.close()
+            ticket.release(record=False)
+            _metrics.observe("stream", time.perf_counter() - started)
+            _metrics.inc("tokens_generated", len(words), endpoint="predict_stream")
+            if not completed:
+                _stream_stats.cancel()
 
-        words = greedy_predict(_tokenizer, _model, text, num_words)
-        completion = " ".join(words)
-        return jsonify({"completion": completion, "words": words})
+    def generate():
+        # A model swap waits for the stream to end
+        with _model_gate.use():
+            yield from events()
+
+    response = Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Also runs when the client goes away before the first event; a slow
+    # reader's time is not service time, so it stays out of the estimate.
+    response.call_on_close(lambda: ticket.release(record=False))
+    return response
+
+
+@app.route("/train", methods=["POST"])
+def train():
+    """Start a background training job (needs X-Train-Token).
+
+    The body may set ``dataset`` (a file in TRAIN_DATA_DIR), ``epochs``,
+    ``batch_size``, ``max_vocab``, ``embed_dim`` and ``lstm_units``; the rest
+    come from the server config. The current model keeps serving until the
+    new one is trained, saved and swapped in. 202 with the job, or 409 while
+    another job runs.
+    """
+    try:
+        try:
+            check_train_token()
+        except PermissionError as e:
+            return jsonify({"error": str(e)}), 403
+        if WORKERS > 1:
+            return jsonify({"error": "training is not available with WORKERS > 1; train with WORKERS=1"}), 409
+        try:
+            data = request.get_json(force=True, silent=True)
+            # An empty body trains with the defaults
+            params = parse_train_args({} if data is None and not request.get_data() else data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        try:
+            job = start_training(params)
+        except TrainingBusy as e:
+            return jsonify({"error": str(e), "job": e.job.status()}), 409
+        response = jsonify({"job": job.status()})
+        response.status_code = 202
+        response.headers["Location"] = f"/train/status?job={job.id}"
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-if __name__ == "__main__":
-    port = int(os.environ.get("PORT", "5000"))
-    app.run(host="0.0.0.0", port=port, debug=False)
+@app.route("/train/status", methods=["GET"])
+def train_status():
+    """One job (``?job=<id>``), or the running job and the recent ones, newest first."""
+    job_id = request.args.get("job")
+    if job_id:
+        job = _training.get(job_id)
+        if job is None:
+            return jsonify({"error": f"no training job {job_id}"}), 404
+        return jsonify(job.status())
+    current = _training.current()
+    return jsonify(
+        {
+            "running": current.status() if current is not None else None,
+            "jobs": [job.status() for job in _training.jobs()],
+        }
+    )
+
+
+# ---------------------- Pre-fork serving ----------------------
+def _pin_worker(index: int):
+    if not PIN_WORKERS or not hasattr(os, "sched_setaffinity"):
+        return
+    cpus = sorted(os.sched_getaffinity(0))
+    per_worker = max(1, WORKER_THREADS)
+    first = index * per_worker
+    os.sched_setaffinity(0, {cpus[(first + j) % len(cpus)] for j in range(per_worker)})
+
+
+def serve_prefork(host: str, port: int, workers: int):
+    """Load the weights once, bind the socket, then fork `workers` servers.
+
+    The weights are a read-only memory map, so every worker reads the same
+    page-cache pages. Each worker starts its own scheduler thread (threads do
+    not survive fork) and warms up before accepting connections. Workers that
+    die are restarted.
+    """
+    from werkzeug.serving import make_server
 
+    if INFERENCE_BACKEND != "numpy":
+        raise SystemExit("WORKERS > 1 requires INFERENCE_BACKEND=numpy (TensorFlow is not fork-safe)")
+    load_artifacts()
+    http_server = make_server(host, port, app, threaded=True)
+    children = {}
+    stopping = False
 
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _pin_worker(index)
+                _startup["worker"] = index
+                bootstrap(load=False)
+                http_server.serve_forever()
+            finally:
+                os._exit(0)
+        children[pid] = index
+        log.info("worker %d started (pid %d)", index, pid)
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        sys.exit(0)
+
+    for index in range(workers):
+        spawn(index)
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    while children:
+        pid, status = os.wait()
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            log.warning("worker %d (pid %d) exited with status %d, restarting", index, pid, status)
+            spawn(index)
+
+
+if not (__name__ == "__main__" and WORKERS > 1):
+    threading.Thread(target=bootstrap, name="bootstrap", daemon=True).start()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    port = int(os.environ.get("PORT", "5000"))
+    if WORKERS > 1:
+        serve_prefork("0.0.0.0", port, WORKERS)
+    else:
+        app.run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,89 @@
+"""
+Single-flight coalescing of identical concurrent computations.
+
+The first caller for a key (the leader) runs the computation; callers that
+arrive with the same key while it is still running wait for it and get the
+same result, or the same exception. Nothing is kept once the leader
+finishes, so this only merges requests that overlap in time - it is not a
+result cache. The returned object is shared by all callers and must not be
+mutated.
+
+A caller may pass its deadline (a `time.monotonic()` value): it then waits
+for the leader no longer than that and raises `DeadlineExceeded` itself.
+The leader computes under its own deadline only, so callers should put
+their time budget in the key - a waiter with the same budget arrived later,
+and if the leader still runs out of time first, a waiter with time left
+computes afresh instead of taking the leader's error.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional, TypeVar
+
+from admission import DeadlineExceeded, expired
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T], deadline: Optional[float] = None) -> T:
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+        if not leader:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not call.done.wait(timeout):
+                raise DeadlineExceeded("deadline exceeded waiting for an identical request")
+            if isinstance(call.error, DeadlineExceeded) and not expired(deadline):
+                return self.do(key, fn, deadline)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Unregister before waking waiters: a caller arriving from now on
+            # starts a fresh computation instead of reading a finished one.
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "max_waiters": self.max_waiters,
+                "coalesced_rate": self.coalesced / self.calls if self.calls else 0.0,
+            }
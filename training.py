@@ -0,0 +1,233 @@
+"""
+Background training jobs with progress reporting.
+
+`TrainingJobs.start(params, run)` calls `run(job)` on a worker thread, one
+job at a time: starting another while one runs raises `TrainingBusy`. A job
+records its state ("running", "succeeded" or "failed"), the loss, duration
+and windows per second of every finished epoch and the batches done in the
+current one (fed by the Keras callback from `progress_callback`), so its
+`status()` can be served while it trains. The newest `keep` jobs stay listed.
+
+`ModelGate` lets requests share the served model while a finished job swaps
+in its replacement: the swap waits for requests in flight and holds new ones
+back until it is done, so no request mixes the old and the new model.
+"""
+
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+
+def _timestamp(t: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(t))
+
+
+class TrainingBusy(Exception):
+    def __init__(self, job: "TrainingJob"):
+        super().__init__(f"training job {job.id} is still running")
+        self.job = job
+
+
+class TrainingJob:
+    def __init__(self, job_id: str, params: Dict):
+        self.id = job_id
+        self.params = dict(params)
+        self.state = "running"
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        # Set by the training function once the data is tokenized
+        self.windows: Optional[int] = None
+        self.steps_per_epoch: Optional[int] = None
+        self.history: List[Dict] = []
+        self.batch = 0
+        self._epoch_started: Optional[float] = None
+
+    def begin(self, windows: int, batch_size: int):
+        self.windows = windows
+        self.steps_per_epoch = math.ceil(windows / batch_size)
+
+    def epoch_begin(self):
+        self.batch = 0
+        self._epoch_started = time.perf_counter()
+
+    def batch_end(self):
+        self.batch += 1
+
+    def epoch_end(self, loss: float):
+        seconds = time.perf_counter() - self._epoch_started
+        self.history.append(
+            {
+                "epoch": len(self.history) + 1,
+                "loss": round(float(loss), 4),
+                "seconds": round(seconds, 3),
+                "windows_per_s": round(self.windows / seconds, 1) if self.windows and seconds > 0 else None,
+            }
+        )
+        self.batch = 0
+        self._epoch_started = None
+
+    @property
+    def epochs(self) -> int:
+        return self.params["epochs"]
+
+    def progress(self) -> float:
+        """Fraction of the planned batches done, 0..1."""
+        if self.state == "succeeded":
+            return 1.0
+        done = len(self.history)
+        if self.steps_per_epoch and self._epoch_started is not None:
+            done += min(1.0, self.batch / self.steps_per_epoch)
+        return min(1.0, done / self.epochs) if self.epochs else 0.0
+
+    def eta_s(self) -> Optional[float]:
+        """Seconds until the last epoch ends, from the pace so far (None before any)."""
+        if self.state != "running":
+            return None
+        elapsed = time.perf_counter() - self._epoch_started if self._epoch_started is not None else 0.0
+        if self.history:
+            per_epoch = sum(e["seconds"] for e in self.history) / len(self.history)
+        elif self.batch and self.steps_per_epoch:
+            per_epoch = elapsed / self.batch * self.steps_per_epoch
+        else:
+            return None
+        return max(0.0, (self.epochs - len(self.history)) * per_epoch - elapsed)
+
+    def status(self) -> Dict:
+        current = None
+        if self._epoch_started is not None and self.batch:
+            elapsed = time.perf_counter() - self._epoch_started
+            batch_size = self.params.get("batch_size") or 0
+            current = {
+                "epoch": len(self.history) + 1,
+                "batch": self.batch,
+                "steps": self.steps_per_epoch,
+                "windows_per_s": round(self.batch * batch_size / elapsed, 1) if elapsed > 0 else None,
+            }
+        eta = self.eta_s()
+        return {
+            "id": self.id,
+            "state": self.state,
+            "params": self.params,
+            "created": _timestamp(self.created),
+            "finished": _timestamp(self.finished) if self.finished else None,
+            "elapsed_s": round((self.finished or time.time()) - self.created, 1),
+            "windows": self.windows,
+            "epochs_done": len(self.history),
+            "epochs": self.epochs,
+            "progress": round(self.progress(), 4),
+            "loss": self.history[-1]["loss"] if self.history else None,
+            "current_epoch": current,
+            "history": self.history,
+            "eta_s": round(eta, 1) if eta is not None else None,
+            "error": self.error,
+        }
+
+
+class TrainingJobs:
+    def __init__(self, keep: int = 10):
+        self.keep = max(1, keep)
+        self._lock = threading.Lock()
+        self._jobs: List[TrainingJob] = []  # newest first
+        self._seq = itertools.count(1)
+
+    def start(self, params: Dict, run: Callable[[TrainingJob], None]) -> TrainingJob:
+        """A new job running `run(job)` on its own thread; raises TrainingBusy."""
+        with self._lock:
+            running = self.current()
+            if running is not None:
+                raise TrainingBusy(running)
+            job = TrainingJob(f"{time.strftime('%Y%m%dT%H%M%S')}-{next(self._seq)}", params)
+            self._jobs.insert(0, job)
+            del self._jobs[self.keep :]
+        threading.Thread(target=self._run, args=(job, run), name=f"training-{job.id}", daemon=True).start()
+        return job
+
+    @staticmethod
+    def _run(job: TrainingJob, run: Callable[[TrainingJob], None]):
+        try:
+            run(job)
+            job.state = "succeeded"
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.state = "failed"
+        finally:
+            job.finished = time.time()
+
+    def current(self) -> Optional[TrainingJob]:
+        """The running job, if any."""
+        return next((job for job in self._jobs if job.state == "running"), None)
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return next((job for job in self._jobs if job.id == job_id), None)
+
+    def jobs(self) -> List[TrainingJob]:
+        return list(self._jobs)
+
+    def stats(self) -> Dict:
+        latest = self._jobs[0] if self._jobs else None
+        return {
+            "running": self.current() is not None,
+            "jobs": len(self._jobs),
+            "latest": {"id": latest.id, "state": latest.state, "progress": round(latest.progress(), 4)}
+            if latest
+            else None,
+        }
+
+
+def progress_callback(job: TrainingJob):
+    """Keras callback feeding `job` its epoch and batch progress."""
+    import tensorflow as tf
+
+    class Progress(tf.keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            job.epoch_begin()
+
+        def on_train_batch_end(self, batch, logs=None):
+            job.batch_end()
+
+        def on_epoch_end(self, epoch, logs=None):
+            job.epoch_end((logs or {}).get("loss", float("nan")))
+
+    return Progress()
+
+
+class ModelGate:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._users = 0
+        self._swapping = False
+
+    @contextmanager
+    def use(self):
+        """Held by a request for as long as it reads the served model."""
+        with self._cond:
+            while self._swapping:
+                self._cond.wait()
+            self._users += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._users -= 1
+                if not self._users:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def swap(self):
+        """Exclusive: entered once the requests in flight are done."""
+        with self._cond:
+            while self._swapping:
+                self._cond.wait()
+            self._swapping = True
+            while self._users:
+                self._cond.wait()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._swapping = False
+                self._cond.notify_all()
@@ -0,0 +1,222 @@
+"""
+Compact, memory-mapped vocabulary.
+
+Replaces the pickled Keras `Tokenizer` at serve time. The file holds only what
+serving needs: the tokenizer settings, a string table of the words in sorted
+byte order with offsets, an id -> table position array and an open-addressing
+hash index (crc32, linear probing) for word -> id. `Vocab.load` maps the file
+read-only (the layout is sectioned_file.py's), so loading costs a header parse and every lookup reads straight
+from the mapping instead of building `word_index`/`index_word` dicts.
+
+Keras assigns ids by descending word count, so a smaller id is always a more
+frequent word. Because the string table is sorted, all words starting with a
+prefix form one contiguous block that two binary searches find
+(`prefix_range`), which is what prefix autocomplete uses.
+"""
+
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fast_tokenizer import compile_splitter
+from sectioned_file import map_sections, read_header, write_sections
+
+
+VOCAB_MAGIC = b"NWPVOCB2"
+
+
+def tokenizer_config(tokenizer) -> Dict:
+    return {
+        "num_words": tokenizer.num_words,
+        "oov_token": tokenizer.oov_token,
+        "filters": tokenizer.filters,
+        "lower": tokenizer.lower,
+        "split": tokenizer.split,
+        "char_level": tokenizer.char_level,
+    }
+
+
+def write_vocab(path: str, words: List[str], config: Dict, source: str = ""):
+    """Write `words` (index = token id, "" for unused ids) to `path`.
+
+    `source` identifies what the vocabulary was built from (a bundle id or a
+    tokenizer digest) so callers can tell when the file is stale.
+    """
+    encoded = [(w.encode("utf-8"), i) for i, w in enumerate(words) if w]
+    encoded.sort()
+    n = len(encoded)
+
+    blob = b"".join(b for b, _ in encoded)
+    offsets = np.zeros(n + 1, dtype=np.uint32)
+    offsets[1:] = np.cumsum([len(b) for b, _ in encoded], dtype=np.uint64)
+    sorted_ids = np.array([i for _, i in encoded], dtype=np.uint32)
+    id_to_pos = np.full(len(words), -1, dtype=np.int32)
+    id_to_pos[sorted_ids] = np.arange(n, dtype=np.int32)
+
+    table_size = 1
+    while table_size < 2 * n + 1:
+        table_size *= 2
+    hash_table = np.zeros(table_size, dtype=np.uint32)
+    mask = table_size - 1
+    for pos, (word, _) in enumerate(encoded):
+        slot = zlib.crc32(word) & mask
+        while hash_table[slot]:
+            slot = (slot + 1) & mask
+        hash_table[slot] = pos + 1
+
+    sections = {
+        "blob": np.frombuffer(blob, dtype=np.uint8),
+        "offsets": offsets,
+        "sorted_ids": sorted_ids,
+        "id_to_pos": id_to_pos,
+        "hash_table": hash_table,
+    }
+    write_sections(path, VOCAB_MAGIC, {"config": config, "source": source, "count": n}, sections)
+
+
+def write_vocab_from_tokenizer(path: str, tokenizer, source: str = ""):
+    """Vocabulary file for a Keras (or engine) tokenizer, ids below num_words only."""
+    size = len(tokenizer.word_index) + 1
+    if tokenizer.num_words:
+        size = min(size, tokenizer.num_words)
+    words = [""] * size
+    for word, idx in tokenizer.word_index.items():
+        if idx < size:
+            words[idx] = word
+    write_vocab(path, words, tokenizer_config(tokenizer), source)
+
+
+def read_vocab_source(path: str) -> Optional[str]:
+    header = read_header(path, VOCAB_MAGIC)
+    return header.get("source") if header is not None else None
+
+
+class Vocab:
+    """Read-only vocabulary backed by a memory-mapped file."""
+
+    def __init__(self, path: str):
+        header, sections = map_sections(path, VOCAB_MAGIC)
+        for name, view in sections.items():
+            setattr(self, "_" + name, view)
+        # Plain memoryviews for scalar reads: indexing them is much cheaper
+        # than indexing NumPy arrays one element at a time.
+        self._blob_bytes = memoryview(self._blob)
+        self._offsets_mv = memoryview(self._offsets).cast("B").cast("I")
+        self._sorted_ids_mv = memoryview(self._sorted_ids).cast("B").cast("I")
+        self._id_to_pos_mv = memoryview(self._id_to_pos).cast("B").cast("i")
+        self._hash_mv = memoryview(self._hash_table).cast("B").cast("I")
+        self._mask = len(self._hash_table) - 1
+
+        config = header["config"]
+        self.source = header.get("source")
+        self.count = header["count"]
+        self.num_words = config["num_words"]
+        self.oov_token = config["oov_token"]
+        self.filters = config["filters"]
+        self.lower = config["lower"]
+        self.split = config["split"]
+        self.char_level = config["char_level"]
+        self._words = compile_splitter(self.filters, self.lower, self.split, self.char_level)
+        # Trailing run of characters that could still grow into a word
+        self._fragment = re.compile("[^" + "".join(re.escape(c) for c in set(self.filters + self.split)) + r"]*\Z")
+        self.oov_index = self.lookup(self.oov_token) if self.oov_token is not None else None
+        # Ids that never stand for a real word: padding and OOV
+        self.special_ids = (0,) if self.oov_index is None else (0, self.oov_index)
+
+    @classmethod
+    def load(cls, path: str) -> "Vocab":
+        return cls(path)
+
+    def __len__(self) -> int:
+        """Number of ids, including the padding id 0."""
+        return len(self._id_to_pos)
+
+    def _word_at(self, pos: int) -> bytes:
+        return bytes(self._blob_bytes[self._offsets_mv[pos] : self._offsets_mv[pos + 1]])
+
+    def word(self, idx: int) -> Optional[str]:
+        """Word for a token id, or None for padding/unknown ids."""
+        if idx <= 0 or idx >= len(self._id_to_pos):
+            return None
+        pos = self._id_to_pos_mv[idx]
+        if pos < 0:
+            return None
+        return self._word_at(pos).decode("utf-8")
+
+    def lookup(self, word: str) -> Optional[int]:
+        """Token id of `word`, or None if it is not in the vocabulary."""
+        key = word.encode("utf-8")
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            entry = self._hash_mv[slot]
+            if entry == 0:
+                return None
+            if self._word_at(entry - 1) == key:
+                return self._sorted_ids_mv[entry - 1]
+            slot = (slot + 1) & self._mask
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """[start, end) of the string-table positions of words starting with `prefix`."""
+        key = prefix.encode("utf-8")
+        start = self._lower_bound(key)
+        lo, hi = start, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word_at(mid).startswith(key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return start, lo
+
+    def ids_with_prefix(self, prefix: str, limit: Optional[int] = None) -> np.ndarray:
+        """Ids of the words starting with `prefix`, most frequent first (no OOV)."""
+        start, end = self.prefix_range(prefix)
+        ids = self._sorted_ids[start:end]
+        if limit is not None and len(ids) > limit:
+            ids = np.partition(ids, limit)[: limit + 1]
+        ids = np.sort(ids)
+        ids = ids[~np.isin(ids, self.special_ids)]
+        return ids[:limit] if limit is not None else ids
+
+    def split_fragment(self, text: str) -> Tuple[str, str]:
+        """(context, fragment): the text before the unfinished last word, and that word.
+
+        The fragment is lowercased like the tokenizer would; it is empty when
+        `text` ends in a separator.
+        """
+        if self.char_level:
+            return text, ""
+        match = self._fragment.search(text)
+        fragment = text[match.start() :]
+        return text[: match.start()], fragment.lower() if self.lower else fragment
+
+    @property
+    def word_index(self) -> Dict[str, int]:
+        """word -> id dict, built on demand (offline tools only; serving uses lookup)."""
+        return {self._word_at(pos).decode("utf-8"): int(i) for pos, i in enumerate(self._sorted_ids)}
+
+    def texts_to_sequences(self, texts: List[str]) -> List[List[int]]:
+        """Same ids as Keras `Tokenizer.texts_to_sequences`."""
+        sequences = []
+        for text in texts:
+            seq = []
+            for w in self._words(text):
+                i = self.lookup(w)
+                if i is not None:
+                    seq.append(i)
+                elif self.oov_index is not None:
+                    seq.append(self.oov_index)
+            sequences.append(seq)
+        return sequences